@@ -11,7 +11,17 @@ print(f'{TOKEN=}')
 
 notifications = False
 
+TOKEN_STORE_BACKEND = getenv('TOKEN_STORE_BACKEND', 'sqlite')  # "sqlite", "memory" или "kv" (общее для нескольких процессов)
+TOKEN_STORE_KV_HOST = getenv('TOKEN_STORE_KV_HOST', '127.0.0.1')
+TOKEN_STORE_KV_PORT = int(getenv('TOKEN_STORE_KV_PORT', 7400))
+TOKEN_STORE_KV_TIMEOUT = 5  # seconds
 USER_TOKENS_DB_PATH = f"{getcwd()}/resources/db/user_tokens.db"
+USER_TOKENS_DB_POOL_SIZE = 2  # соединений с базой токенов
+USER_TOKENS_DB_WRITE_DELAY = 0.05  # seconds, изменения за это время записываются одной транзакцией
+TOKEN_EXPIRY_LEEWAY = 60  # seconds, токен, истекающий раньше, считается истёкшим
+EXPIRED_TOKENS_PURGE_INTERVAL = 60 * 60  # seconds
+LOGIN_ATTEMPTS_MAX = 5  # попыток входа одного пользователя за LOGIN_ATTEMPTS_WINDOW
+LOGIN_ATTEMPTS_WINDOW = 15 * 60  # seconds
 
 NOTIFICATION_SPREADSHEET_URL = getenv('NOTIFICATION_SPREADSHEET_URL')
 TECHSUPPORT_SPREADSHEET_URL = getenv('TECHSUPPORT_SPREADSHEET_URL')
@@ -21,6 +31,50 @@ TIMEZONE = pytz.timezone('Europe/Moscow')
 
 API_PATH = getenv('API_PATH')
 
+API_CONNECTIONS_LIMIT = 100
+API_CONNECTIONS_LIMIT_PER_HOST = 20
+API_KEEPALIVE_TIMEOUT = 60  # seconds
+API_LOGIN_TIMEOUT = 15  # seconds
+API_REQUEST_TIMEOUT = 20  # seconds, на один запрос к API
+
+API_RETRY_ATTEMPTS = 2  # повторов одного запроса отчёта
+API_RETRY_BACKOFF_BASE = 0.2  # seconds
+API_RETRY_BACKOFF_MAX = 2  # seconds
+API_RETRY_BUDGET_RATIO = 0.1  # повторов на один запрос
+API_RETRY_BUDGET_MAX = 10  # повторов подряд
+
+API_CIRCUIT_BREAKER_FAILURES = 5  # ошибок подряд до отключения запросов к API
+API_CIRCUIT_BREAKER_COOLDOWN = 30  # seconds
+
+REPORT_DEADLINE = 40  # seconds, на загрузку всего отчёта
+
+REPORT_REQUESTS_CONCURRENCY = 5  # одновременных запросов на один отчёт
+REPORT_CACHE_MAX_SIZE = 64 * 1024 * 1024  # bytes
+REPORT_CACHE_OPEN_PERIOD_TTL = 5 * 60  # seconds, "this-*" и "last-day"
+REPORT_CACHE_CLOSED_PERIOD_TTL = 7 * 24 * 60 * 60  # seconds, "last-*"
+REPORT_CACHE_STALE_WINDOW = 6 * 60 * 60  # seconds, сколько после истечения срока отдавать устаревшие данные
+RENDER_CACHE_MAX_SIZE = 8 * 1024 * 1024  # символов в готовых текстах отчётов
+COLUMNAR_MIN_ROWS = 2000  # строк в отчёте, начиная с которых тексты считаются по столбцам numpy (если установлен)
+REPORT_CACHE_DB_PATH = f"{getcwd()}/resources/db/report_cache.db"  # кэш отчётов и подразделений на диске
+REPORT_CACHE_DB_PURGE_EVERY = 1000  # удалять истёкшие записи раз в столько записей в кэш
+DEPARTMENTS_CACHE_TTL = 10 * 60  # seconds
+DEPARTMENTS_CONCURRENCY = 4  # одновременно загружаемых подразделений для "вся сеть (по объектам отдельно)"
+PREFETCH_CONCURRENCY = 2  # отчётов, загружаемых заранее одновременно (для всех пользователей)
+PREFETCH_MAX_REPORTS = 4  # вариантов отчёта, загружаемых заранее для одного пользователя
+PREFETCH_TTL = 5 * 60  # seconds, сколько хранить заранее загруженный отчёт, если его не открыли
+PREFETCH_HISTORY_MAX_USERS = 10000  # пользователей, для которых хранится история открытых отчётов
+PREWARM_TIME = '06:30'  # ежедневная загрузка отчётов за закрытые периоды в кэш
+PREWARM_PERIODS = ["last-week", "last-month"]
+PREWARM_REQUEST_BUDGET = 500  # запросов к API за один прогрев
+SPLIT_NETWORK_REPORTS = True  # загружать "вся сеть (по объектам отдельно)" одним запросом и делить по подразделениям
+
+# состояния пользователей (aiogram FSM)
+FSM_STORAGE_PATH = f"{getcwd()}/resources/db/fsm.db"
+FSM_STORAGE_TTL = 14 * 24 * 60 * 60  # seconds, состояние пользователя удаляется после стольких секунд без изменений
+FSM_STORAGE_MAX_RECORDS = 10000  # состояний в памяти, остальные читаются с диска
+FSM_STORAGE_WRITE_DELAY = 0.5  # seconds, изменения за это время записываются одной транзакцией
+FSM_STORAGE_CLEANUP_INTERVAL = 6 * 60 * 60  # seconds
+
 SENDING_TIME = {'DAY': '22:26', 'WEEK': '12:00', 'MONTH': '10:30'}
 
 WORKING_DAYS = '0-4'  # 0-monday, 1-tuesday, etc...
@@ -6,13 +6,20 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.filters import Command
 from aiogram.types import Message
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from src.analytics.db.db import user_tokens_db
 from src.mailing.notification.sender import NotificationSender
 from src.analytics.db import db
+from src.analytics.api_session import close_session
+from src.analytics.cache.persistent_cache import persistent_cache
+from src.analytics.prewarm import report_cache_warmer
+from src.analytics.auth import token_expiry
 
 import config as cf
 from src.util.log import logger
+from src.util.fsm_storage import SQLiteStorage
+from src.util.fsm_snapshot import FSMSnapshotMiddleware
 from src.basic.commands.start_command import router as start_command_router
 from src.mailing.commands.registration.register.registration_command import router as register_command_router
 from src.mailing.commands.registration.unregister.unregistration_command import router as unregister_command_router
@@ -39,7 +46,16 @@ routers = [
     mailing_router
 ]
 
-dp = Dispatcher()
+fsm_storage = SQLiteStorage(
+    path=cf.FSM_STORAGE_PATH,
+    ttl=cf.FSM_STORAGE_TTL,
+    max_records=cf.FSM_STORAGE_MAX_RECORDS,
+    write_delay=cf.FSM_STORAGE_WRITE_DELAY,
+)
+dp = Dispatcher(storage=fsm_storage)
+# состояние читается и записывается один раз за обновление (после FSMContextMiddleware);
+# список сообщений для удаления сразу видят все обновления пользователя
+dp.update.outer_middleware(FSMSnapshotMiddleware(shared_keys={"report:messages_to_delete"}))
 
 
 @router.message(Command("test"))
@@ -63,6 +79,16 @@ async def main() -> None:
         sender = NotificationSender(bot)
         sender.start()
 
+    # прогрев кэша отчётов и удаление устаревших данных выполняются планировщиком рассылки, если он запущен
+    scheduler = sender.scheduler if cf.notifications else AsyncIOScheduler(timezone=cf.TIMEZONE, job_defaults={'misfire_grace_time': None})
+    report_cache_warmer.add_jobs(scheduler)
+    token_expiry.add_jobs(scheduler)
+    scheduler.add_job(fsm_storage.remove_idle, 'interval', seconds=cf.FSM_STORAGE_CLEANUP_INTERVAL)
+    if not scheduler.running:
+        scheduler.start()
+
+    await user_tokens_db.start()
+
     try:
         logger.info('bot is running!')
         await dp.start_polling(bot)
@@ -71,8 +97,14 @@ async def main() -> None:
 
         if cf.notifications:
             sender.stop()
+        else:
+            scheduler.shutdown()
+
+        await user_tokens_db.aclose()
+        await fsm_storage.close()
+        persistent_cache.close()
 
-        user_tokens_db.close()
+        await close_session()
 
         logger.info('stopping')
 
@@ -0,0 +1,207 @@
+# сравнение ТОП 10 роста/снижения цен (losses_texts, loss_forecast_texts) с прежними версиями, которые сортировали все товары.
+# прежние версии (до перехода на TopK) скопированы ниже без изменений, кроме имён функций.
+# запуск из клона репозитория на той же версии python, что и бот (3.12):
+#   python scripts/bench_ranking.py
+import random
+import sys
+import timeit
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from src.analytics.handlers.text import losses_texts, loss_forecast_texts
+from src.analytics.handlers.types.text_data import TextData
+
+
+periods = ["this-month", "last-month", "last-week"]
+sizes = [10_000, 50_000]
+
+losses_keys = [
+    "avg_price_current_month", "avg_price_last_month", "avg_price_month_before_last",
+    "avg_price_last_week", "avg_price_week_before_last",
+]
+losses_loss_keys = ["losses_current_month_to_last", "losses_last_month_to_month_before_last", "losses_last_week_to_week_before_last"]
+forecast_keys = ["avg_price_one_week_ago", "avg_price_two_week_ago", "avg_price_three_week_ago", "avg_price_four_week_ago"]
+
+
+def sorted_losses_text(data: list, period: str, only_negative: bool) -> list[str]:
+    data = data[0]
+    report = "<b>Рост закупочных цен:</b>\n"
+    report += "<b><i>цена старая / цена новая / факт потерь за период</i></b>\n\nТОП 10:\n"
+
+    period_mapping = {
+        "this-month": ("avg_price_current_month", "avg_price_last_month", "losses_current_month_to_last"),
+        "last-month": ("avg_price_last_month", "avg_price_month_before_last", "losses_last_month_to_month_before_last"),
+        "last-week": ("avg_price_last_week", "avg_price_week_before_last", "losses_last_week_to_week_before_last")
+    }
+
+    price_key_current, price_key_previous, loss_key = period_mapping.get(period, period_mapping["last-week"])
+
+    price_increase = sorted(
+        [item for item in data["data"] if
+         item[price_key_current] and item[price_key_previous] and item[price_key_current] > item[price_key_previous]],
+        key=lambda x: x[loss_key],
+        reverse=True
+    )[:10]
+
+    for i in range(len(price_increase)):
+        item = price_increase[i]
+        report += f"{i+1}. {item['label']} {item[price_key_previous]:,.0f} руб / {item[price_key_current]:,.0f} руб / {item[loss_key]:,.0f} руб\n"
+
+    if not only_negative:
+        report += "\n<b>Снижение закупочных цен:</b>\n"
+        report += "<b><i>цена старая / цена новая / факт потерь за период</i></b>\n\nТОП 10:\n"
+
+        price_decrease = sorted(
+            [item for item in data["data"] if
+            item[price_key_current] and item[price_key_previous] and item[price_key_current] < item[price_key_previous]],
+            key=lambda x: x[loss_key]
+        )[:10]
+
+        for i in range(len(price_decrease)):
+            item = price_decrease[i]
+            report += f"{i+1}. {item['label']} {item[price_key_previous]:,.0f} руб / {item[price_key_current]:,.0f} руб / {item[loss_key]:,.0f} руб\n"
+
+    total_loss = data["sum"][loss_key]
+
+    report += f"\n<b>Общая сумма потерь/прибыли за период:</b> {total_loss:,.0f} руб"
+
+    return [report]
+
+
+def sorted_forecast_text(text_data: TextData) -> list[str]:
+    data = text_data.reports[0]
+    period = text_data.period
+
+    period_mapping = {
+        "this-month": ("avg_price_two_week_ago", "avg_price_one_week_ago", "diff_price2"),
+        "last-month": ("avg_price_three_week_ago", "avg_price_two_week_ago", "diff_price3"),
+        "last-week": ("avg_price_four_week_ago", "avg_price_one_week_ago", "diff_price4"),
+    }
+
+    if period not in period_mapping:
+        return "Ошибка: Некорректный период."
+
+    old_price_key, new_price_key, loss_key = period_mapping[period]
+
+    increasing_prices = []
+    decreasing_prices = []
+
+    for item in data["data"]:
+        old_price = item.get(old_price_key)
+        new_price = item.get(new_price_key)
+        forecast_loss = round(item.get("forecast", 0), 2)  # Прогнозируемые потери
+
+        if old_price is not None and new_price is not None:
+            if new_price > old_price:
+                increasing_prices.append((item["label"], old_price, new_price, forecast_loss))
+            elif new_price < old_price:
+                decreasing_prices.append((item["label"], old_price, new_price, forecast_loss))
+
+    increasing_prices.sort(key=lambda x: x[3], reverse=True)
+    decreasing_prices.sort(key=lambda x: x[3], reverse=True)
+
+    total_loss = data["sum"].get("forecast", 0)
+
+    price_increase_texts = []
+    for name, old, new, loss in increasing_prices[:10]:
+        price_increase_texts.append(f"{len(price_increase_texts) + 1}. {name} {old} руб / {new} руб / {loss} руб")
+
+    price_decrease_texts = []
+    for name, old, new, loss in decreasing_prices[:10]:
+        price_decrease_texts.append(f"{len(price_decrease_texts) + 1}. {name} {old} руб / {new} руб / {loss} руб")
+
+    report = f"""
+🔥 <b>Рост закупочных цен:</b>
+<b><i>цена старая / цена новая / прогноз потерь за период</i></b>
+
+🔝 ТОП 10:
+""" + "\n".join(price_increase_texts) + "\n"
+
+    if not text_data.only_negative:
+        report += """
+📉 <b>Снижение закупочных цен:</b>
+<b><i>цена старая / цена новая / прогноз потерь за период</i></b>
+
+🔝 ТОП 10:
+""" + "\n".join(price_decrease_texts) + f"""
+
+💰 <b>Общая сумма потерь/прибыли за период:</b> {round(total_loss, 2)} руб
+"""
+
+    return [report]
+
+
+def price(rnd: random.Random) -> int | None:
+    # часть цен отсутствует, часть совпадает
+    return None if rnd.random() < 0.05 else rnd.randint(1, 300)
+
+
+def make_losses_report(count: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    data = []
+    for index in range(count):
+        row = {"label": f"Товар {index}"} | {key: price(rnd) for key in losses_keys}
+        # потери округлены до сотен, чтобы было много равных значений
+        data.append(row | {key: round(rnd.uniform(-50_000, 50_000), -2) for key in losses_loss_keys})
+    return {"data": data, "sum": {key: 0 for key in losses_loss_keys}}
+
+
+def make_forecast_report(count: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    data = [
+        {"label": f"Товар {index}"} | {key: price(rnd) for key in forecast_keys} | {"forecast": rnd.uniform(-5_000, 5_000) // 10 * 10}
+        for index in range(count)
+    ]
+    return {"data": data, "sum": {"forecast": sum(row["forecast"] for row in data)}}
+
+
+def check(losses_report: dict, forecast_report: dict) -> int:
+    cases = 0
+    for period in periods:
+        for only_negative in (False, True):
+            expected = sorted_losses_text([losses_report], period, only_negative)
+            actual = losses_texts.losses_text([losses_report], period, only_negative)
+            assert actual == expected, f"losses texts differ: {period=}, {only_negative=}"
+
+            text_data = TextData(reports=[forecast_report], period=period, department="", only_negative=only_negative)
+            expected = sorted_forecast_text(text_data)
+            actual = loss_forecast_texts.forecast_text(text_data)
+            assert actual == expected, f"forecast texts differ: {period=}, {only_negative=}"
+            cases += 2
+    return cases
+
+
+def bench(*funcs, number: int = 5, repeat: int = 9) -> list[float]:
+    # лучшее время одного вызова каждой функции, мс; функции замеряются поочерёдно, чтобы шум сказывался на всех одинаково
+    best = [float("inf")] * len(funcs)
+    for _ in range(repeat):
+        for index, func in enumerate(funcs):
+            best[index] = min(best[index], timeit.timeit(func, number=number) / number * 1000)
+    return best
+
+
+def main() -> None:
+    for size in sizes:
+        losses_report = make_losses_report(size, seed=size)
+        forecast_report = make_forecast_report(size, seed=size)
+        cases = check(losses_report, forecast_report)
+        print(f"{size} products, {cases} cases: texts match")
+
+        before, after = bench(
+            lambda: sorted_losses_text([losses_report], "last-week", False),
+            lambda: losses_texts.losses_text([losses_report], "last-week", False),
+        )
+        print(f"  losses: sorted {before:.2f} ms, TopK {after:.2f} ms ({before / after:.1f}x)")
+
+        text_data = TextData(reports=[forecast_report], period="last-week", department="", only_negative=False)
+        before, after = bench(
+            lambda: sorted_forecast_text(text_data),
+            lambda: loss_forecast_texts.forecast_text(text_data),
+        )
+        print(f"  forecast: sorted {before:.2f} ms, TopK {after:.2f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
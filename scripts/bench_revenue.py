@@ -0,0 +1,116 @@
+# сравнение разбора выручки (revenue_texts) с прежним рендерером, который собирал текст сложением строк.
+# прежний рендерер берётся из истории git: ревизия указывается явно, это любая ревизия до перехода на построители разделов
+# и до частичной отрисовки при таймаутах (например, родитель коммита слияния этих изменений).
+# запуск из клона репозитория на той же версии python, что и бот (3.12):
+#   python scripts/bench_revenue.py <ревизия>
+import itertools
+import json
+import subprocess
+import sys
+import timeit
+import types
+from pathlib import Path
+
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from src.analytics.handlers.text import revenue_texts
+from src.analytics.handlers.types.text_data import TextData
+
+
+fixture_path = root / "resources" / "jsons_for_test" / "revenue analys.json"
+
+periods = ["this-week", "last-month", "this-year", "last-day"]
+period_keys = ["week", "month", "year"]
+dish_words = ["Салат", "Суп", "Пирог", "Капучино", "Стейк"]
+
+
+def load_baseline(revision: str) -> types.ModuleType:
+    source = subprocess.run(
+        ["git", "show", f"{revision}:src/analytics/handlers/text/revenue_texts.py"],
+        cwd=root, check=True, capture_output=True, text=True,
+    ).stdout
+    # модуль в том же пакете, чтобы работали относительные импорты
+    module = types.ModuleType("src.analytics.handlers.text.revenue_texts_baseline")
+    module.__package__ = "src.analytics.handlers.text"
+    exec(compile(source, f"{revision}:revenue_texts.py", "exec"), module.__dict__)
+    return module
+
+
+def make_reports(fixture: dict, stores: int, dishes: int, waiters: int) -> list[dict]:
+    # 10 отчётов разбора выручки (порядок как в urls.py) из строк выручки по объектам
+    rows = fixture["data"]
+    total = fixture["sum"]
+
+    def scaled(count: int, label) -> list[dict]:
+        return [dict(row, label=label(index)) for index, row in zip(range(count), itertools.cycle(rows))]
+
+    def summary(name: str, divider: int, dynamics: str) -> dict:
+        values = {name: total["revenue"] // divider}
+        for key in period_keys:
+            values[f"{name}_{key}"] = total[f"revenue_{key}"] // divider
+            values[f"{name}_{dynamics}_{key}"] = total[f"revenue_dynamics_{key}"]
+        return values
+
+    days = list(revenue_texts.days_of_week)
+    return [
+        {"data": [], "sum": summary("guests", 700, "dynamics") | summary("checks", 800, "dynamics")},
+        {"data": [], "sum": summary("avg_check", 10000, "dynamics")},
+        fixture,
+        {"data": scaled(stores, lambda i: f"{i}.{'Бар' if i % 2 else 'Кухня'}")},
+        {"data": scaled(dishes, lambda i: f"{dish_words[i % len(dish_words)]} {i}")},
+        {"data": scaled(24, lambda i: f"{i}:00")},
+        {"data": scaled(8, lambda i: f"{i * 500}-{i * 500 + 499}")},
+        {"data": scaled(len(days), lambda i: days[i])},
+        {"data": [
+            {"label": f"Сотрудник {i}", "revenue": (i * 7919) % 20001 - 10000, "avg_revenue": i * 100, "avg_checks": 900 + i % 50, "depth": 2}
+            for i in range(waiters)
+        ]},
+        {"data": [], "sum": {"depth": 3} | {f"depth_{key}": 3.2 for key in period_keys} | {f"depth_dynamic_{key}": -1 for key in period_keys}},
+    ]
+
+
+def check(baseline: types.ModuleType, reports: list[dict]) -> int:
+    cases = 0
+    for period in periods:
+        for only_negative in (False, True):
+            for recommendations in (False, True):
+                text_data = TextData(reports=reports, period=period, department="", only_negative=only_negative)
+                expected = baseline.revenue_analysis_text(text_data, recommendations=recommendations)
+                actual = revenue_texts.revenue_analysis_text(text_data, recommendations=recommendations)
+                assert actual == expected, f"texts differ: {period=}, {only_negative=}, {recommendations=}"
+                cases += 1
+    return cases
+
+
+def bench(*funcs, number: int = 20, repeat: int = 15) -> list[float]:
+    # лучшее время одного вызова каждой функции, мс; функции замеряются поочерёдно, чтобы шум сказывался на всех одинаково
+    best = [float("inf")] * len(funcs)
+    for _ in range(repeat):
+        for index, func in enumerate(funcs):
+            best[index] = min(best[index], timeit.timeit(func, number=number) / number * 1000)
+    return best
+
+
+def main() -> None:
+    if len(sys.argv) != 2:
+        sys.exit("usage: python scripts/bench_revenue.py <baseline revision>")
+    baseline = load_baseline(sys.argv[1])
+    fixture = json.loads(fixture_path.read_text(encoding="utf-8"))
+
+    small = make_reports(fixture, stores=len(fixture["data"]), dishes=len(fixture["data"]), waiters=20)
+    large = make_reports(fixture, stores=600, dishes=5000, waiters=2000)
+    cases = check(baseline, small) + check(baseline, large)
+    print(f"{cases} cases: texts match")
+
+    for name, reports in (("fixture", small), ("5k dishes", large)):
+        text_data = TextData(reports=reports, period="last-week", department="", only_negative=False)
+        before, after = bench(
+            lambda: baseline.revenue_analysis_text(text_data, recommendations=True),
+            lambda: revenue_texts.revenue_analysis_text(text_data, recommendations=True),
+        )
+        print(f"{name}: baseline {before:.2f} ms, current {after:.2f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
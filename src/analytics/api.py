@@ -1,28 +1,102 @@
-import requests
+import json
 
-from asyncio import get_event_loop
+from asyncio import CancelledError, create_task, gather, get_running_loop, sleep, timeout_at, Semaphore, Task
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
 
-from .api_util import get_dates, get_requests_datas_from_state_data, ReportRequestData
+from aiohttp import ClientError, ClientTimeout
 
+from .api_util import get_dates, get_requests_datas_from_state_data, payload_digest, ReportRequestData, ReportResponse
+from .api_session import get_session
+from .cache.report_cache import report_cache, report_cache_key, report_cache_ttl, load_persisted_report, persist_report
+from .cache.departments_cache import departments_directory, Departments
+from .api_resilience import api_circuit_breaker, retry_budget, backoff_delay
+
+from .auth.tenant import tenant_registry
 from .db.db import user_tokens_db
+from src.util.single_flight import SingleFlight
 from src.util.log import logger
 import config as cf
 
 
-async def get_reports_from_state(tgid: int, state_data: dict, type_prefix: str) -> list[dict] | None:
+# ответы API, после которых запрос стоит повторить
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# одинаковые одновременные запросы к API (например, несколько менеджеров одной сети) выполняются один раз
+report_single_flight = SingleFlight()
+
+# фоновые обновления устаревших отчётов
+background_tasks: set[Task] = set()
+
+
+async def get_reports_from_state(tgid: int, state_data: dict, type_prefix: str, deadline: float | None = None) -> list[dict] | None:
     request_data_list = get_requests_datas_from_state_data(tgid, state_data, type_prefix)
-    return await get_reports(request_data_list)
+    return await get_reports(request_data_list, deadline=deadline)
+
+
+async def get_reports(request_data_list: list[ReportRequestData], concurrency: int = cf.REPORT_REQUESTS_CONCURRENCY, deadline: float | None = None, prefetch: bool = False) -> list[dict] | None:
+    # все запросы отчёта отправляются одновременно (не более concurrency за раз),
+    # порядок ответов совпадает с порядком request_data_list.
+    # deadline - время цикла событий (loop.time()), после которого недополученные ответы считаются None.
+    # prefetch - отчёт загружается заранее, пользователь его ещё не запрашивал
+    semaphore = Semaphore(concurrency)
+    if deadline is None:
+        deadline = get_running_loop().time() + cf.REPORT_DEADLINE
+
+    async def get_report(request_data: ReportRequestData) -> dict | None:
+        key = report_cache_key(request_data)
+        await load_persisted_report(key)
+        response = report_cache.get(key, prefetch=prefetch)
+        if response is not None:
+            return response
 
+        # устаревшие данные отдаём сразу и обновляем в фоне,
+        # а пока API недоступно - просто отдаём последние сохранённые данные
+        stale_response = report_cache.get_stale(key, max_stale=cf.REPORT_CACHE_STALE_WINDOW)
+        if stale_response is not None:
+            if not api_circuit_breaker.is_open():
+                refresh_in_background(key, lambda: fetch_report(request_data, key))
+            return stale_response
 
-async def get_reports(request_data_list: list[ReportRequestData]) -> list[dict] | None:
-    responses = []
-    for request_data in request_data_list:
-        loop = get_event_loop()
-        response = await loop.run_in_executor(None, m_req_get_report, request_data.token, request_data.url, request_data.group, request_data.departments, request_data.date_from, request_data.date_to)
-        responses.append(response)
-    return responses
+        try:
+            async with timeout_at(deadline):
+                return await report_single_flight.do(key, lambda: fetch_report(request_data, key))
+        except TimeoutError:
+            logger.msg("ERROR", f"Report deadline exceeded: url={request_data.url}, group={request_data.group}")
+            return None
 
-def m_req_get_report(token: str, url: str, group: str, departments: list[str], date_from: str, date_to: str) -> dict | None:
+    async def fetch_report(request_data: ReportRequestData, key: tuple) -> dict | None:
+        async with semaphore:
+            response = await req_get_report(request_data.token, request_data.url, request_data.group, request_data.departments, request_data.date_from, request_data.date_to)
+
+        if response is not None:
+            expires_at = report_cache.set(key, response, ttl=report_cache_ttl(request_data.period), prefetched=prefetch)
+            if expires_at is not None:
+                persist_report(key, response, expires_at)
+        return response
+
+    responses = await gather(*(get_report(request_data) for request_data in request_data_list))
+    return list(responses)
+
+def refresh_in_background(key: tuple, fetch: Callable[[], Awaitable[dict | None]]) -> None:
+    task = create_task(report_single_flight.do(key, fetch))
+    # держим ссылку на задачу до её завершения
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+def get_reports_data_as_of(reports: list[dict | None], period: str) -> datetime | None:
+    # время получения самых старых из отчётов, которые старше обычного срока хранения в кэше (None - все данные свежие)
+    ttl = timedelta(seconds=report_cache_ttl(period))
+    now = datetime.now(tz=cf.TIMEZONE)
+    stale = [
+        report.fetched_at for report in reports
+        if isinstance(report, ReportResponse) and report.fetched_at is not None and now - report.fetched_at > ttl
+    ]
+    return min(stale, default=None)
+
+
+async def req_get_report(token: str, url: str, group: str, departments: list[str], date_from: str, date_to: str, timeout: float = cf.API_REQUEST_TIMEOUT) -> ReportResponse | None:
     data = {
         "dateFrom": date_from,
         "dateTo": date_to,
@@ -31,39 +105,102 @@ def m_req_get_report(token: str, url: str, group: str, departments: list[str], d
     }
     
     logger.debug(f"SendRequest: {url=}, {data=}, {token=}")
-    
-    req = requests.post(
-        url=f"{cf.API_PATH}/api/{url}",
-        headers={
-            "Authorization": f"Bearer {token}", 
-            "Content-type": "application/json",
-        },
-        json=data
-    )
-    
-    logger.debug(f"ResievedResponse: {req.text}, status={req.status_code}; request: {url=}, {data=}, {token=}")
-    
-    if req.status_code != 200:
-        logger.msg("ERROR", f"Could not get request: {url=}, {data=}, {token=}")
-        return None
-    return req.json()
+
+    # запрос отчёта не изменяет данных, поэтому при сбоях API его можно повторить
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        if not api_circuit_breaker.allow_request():
+            logger.msg("ERROR", f"Could not get request (API is unavailable): {url=}, {data=}, {token=}")
+            return None
+
+        status, body = None, b""
+        try:
+            async with get_session().post(
+                url=f"{cf.API_PATH}/api/{url}",
+                headers={
+                    "Authorization": f"Bearer {token}", 
+                    "Content-type": "application/json",
+                },
+                json=data,
+                timeout=ClientTimeout(total=timeout),
+            ) as req:
+                body = await req.read()
+                status = req.status
+        except (ClientError, TimeoutError) as e:
+            logger.msg("ERROR", f"Could not get request: {url=}, {data=}, {token=}, {e=}")
+        except CancelledError:
+            # иначе отменённый пробный запрос оставит API отключённым
+            api_circuit_breaker.release_probe()
+            raise
+        else:
+            logger.debug(f"ResievedResponse: {body.decode(errors='replace')}, status={status}; request: {url=}, {data=}, {token=}")
+
+        if status is not None and status not in RETRYABLE_STATUSES:
+            api_circuit_breaker.record_success()
+            if status != 200:
+                logger.msg("ERROR", f"Could not get request: {url=}, {data=}, {token=}")
+                return None
+            tenant_registry.validate(token)
+            try:
+                return ReportResponse(json.loads(body), size=len(body), fetched_at=datetime.now(tz=cf.TIMEZONE), digest=payload_digest(body))
+            except ValueError as e:
+                logger.msg("ERROR", f"Could not get request: {url=}, {data=}, {token=}, {e=}")
+                return None
+
+        api_circuit_breaker.record_failure()
+        if attempt >= cf.API_RETRY_ATTEMPTS or not retry_budget.withdraw():
+            logger.msg("ERROR", f"Could not get request: {url=}, {data=}, {token=}, {status=}")
+            return None
+        await sleep(backoff_delay(attempt))
+        attempt += 1
 
 
 async def get_departments(tgid: int) -> dict:
+    return dict((await get_departments_directory(tgid)).names)
+
+
+async def get_department_display_names(tgid: int) -> dict:
+    return dict((await get_departments_directory(tgid)).display_names)
+
+
+async def get_departments_directory(tgid: int) -> Departments:
     token = user_tokens_db.get_token(tgid=str(tgid))
-    loop = get_event_loop()
-    departments = await loop.run_in_executor(None, m_req_get_departments, token)
-    departments_remapped = { dep["id"]: dep["name"] for dep in departments }
-    return departments_remapped
-
-def m_req_get_departments(token: str) -> dict:
-    req = requests.get(
-        url=f"{cf.API_PATH}/api/departments",
-        headers={"Authorization": f"Bearer {token}"},
-    )
-    if req.status_code != 200:
-        logger.msg("ERROR", f"Could not get departments: {token=}")
-        return []
-    return req.json()['departments']
+    return await get_token_departments_directory(token)
+
 
+async def get_token_departments_directory(token: str) -> Departments:
+    departments = await departments_directory.get(tenant_registry.get_user_key(token), lambda: req_get_departments(token))
+    if departments.names:
+        tenant_registry.set_departments(token, departments.names.keys())
+    return departments
 
+async def req_get_departments(token: str) -> list[dict]:
+    if not api_circuit_breaker.allow_request():
+        logger.msg("ERROR", f"Could not get departments (API is unavailable): {token=}")
+        return []
+    try:
+        async with get_session().get(
+            url=f"{cf.API_PATH}/api/departments",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=ClientTimeout(total=cf.API_REQUEST_TIMEOUT),
+        ) as req:
+            if req.status in RETRYABLE_STATUSES:
+                api_circuit_breaker.record_failure()
+            else:
+                api_circuit_breaker.record_success()
+            if req.status != 200:
+                logger.msg("ERROR", f"Could not get departments: {token=}")
+                return []
+            tenant_registry.validate(token)
+            return (await req.json(content_type=None))['departments']
+    except (ClientError, TimeoutError) as e:
+        api_circuit_breaker.record_failure()
+        logger.msg("ERROR", f"Could not get departments: {token=}, {e=}")
+        return []
+    except ValueError as e:
+        logger.msg("ERROR", f"Could not get departments: {token=}, {e=}")
+        return []
+    except CancelledError:
+        api_circuit_breaker.release_probe()
+        raise
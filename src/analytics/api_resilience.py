@@ -0,0 +1,104 @@
+from asyncio import Task, current_task
+from random import uniform
+from time import monotonic
+
+from src.util.log import logger
+import config as cf
+
+
+class RetryBudget:
+    # повторные запросы разрешены не чаще, чем ratio от числа обычных запросов (не больше max_tokens подряд),
+    # чтобы при перегрузке API повторы не умножали нагрузку
+    def __init__(self, ratio: float, max_tokens: float) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.retries = 0
+        self.rejected = 0
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            self.rejected += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"tokens": round(self.tokens, 2), "retries": self.retries, "rejected": self.rejected}
+
+
+def backoff_delay(attempt: int) -> float:
+    # экспоненциальная задержка с "полным" случайным разбросом
+    return uniform(0, min(cf.API_RETRY_BACKOFF_MAX, cf.API_RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+class CircuitBreakerState:
+    CLOSED = "closed"        # запросы идут как обычно
+    OPEN = "open"            # API недоступно, запросы сразу отклоняются
+    HALF_OPEN = "half_open"  # пробный запрос после паузы
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, cooldown: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CircuitBreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe: Task | None = None  # задача, выполняющая пробный запрос
+
+    def is_open(self) -> bool:
+        return self.state == CircuitBreakerState.OPEN and monotonic() - self.opened_at < self.cooldown
+
+    def allow_request(self) -> bool:
+        if self.state == CircuitBreakerState.OPEN and not self.is_open():
+            self._set_state(CircuitBreakerState.HALF_OPEN)
+        if self.state == CircuitBreakerState.CLOSED:
+            return True
+        if self.state == CircuitBreakerState.HALF_OPEN and self._probe is None:
+            self._probe = current_task()
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe = None
+        if self.state != CircuitBreakerState.CLOSED:
+            self._set_state(CircuitBreakerState.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe = None
+        if self.state == CircuitBreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = monotonic()
+            if self.state != CircuitBreakerState.OPEN:
+                self._set_state(CircuitBreakerState.OPEN)
+
+    def release_probe(self) -> None:
+        # пробный запрос отменён до ответа (deadline, отмена загрузки заранее) - следующий запрос станет пробным.
+        # запросы других задач пробный запрос не освобождают
+        if self._probe is not None and self._probe is current_task():
+            self._probe = None
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+    def _set_state(self, state: str) -> None:
+        logger.msg("WARNING", f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+
+
+retry_budget = RetryBudget(ratio=cf.API_RETRY_BUDGET_RATIO, max_tokens=cf.API_RETRY_BUDGET_MAX)
+
+api_circuit_breaker = CircuitBreaker(
+    name="API",
+    failure_threshold=cf.API_CIRCUIT_BREAKER_FAILURES,
+    cooldown=cf.API_CIRCUIT_BREAKER_COOLDOWN,
+)
@@ -0,0 +1,26 @@
+from aiohttp import ClientSession, TCPConnector
+
+import config as cf
+
+
+_session: ClientSession | None = None
+
+
+# одна сессия (пул соединений с keep-alive) на весь процесс
+def get_session() -> ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        connector = TCPConnector(
+            limit=cf.API_CONNECTIONS_LIMIT,
+            limit_per_host=cf.API_CONNECTIONS_LIMIT_PER_HOST,
+            keepalive_timeout=cf.API_KEEPALIVE_TIMEOUT,
+        )
+        _session = ClientSession(connector=connector)
+    return _session
+
+
+async def close_session() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
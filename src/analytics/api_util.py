@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime, timedelta
 
 from dataclasses import dataclass
@@ -19,37 +20,64 @@ class ReportRequestData:
     date_from: str
     date_to: str
     departments: list[str]
+    period: str | None = None
+
+
+class ReportResponse(dict):
+    # ответ API; size - размер исходного JSON в байтах, fetched_at - время получения от API,
+    # digest - хэш исходного JSON (одинаковые данные - одинаковый digest)
+    size: int = 0
+    fetched_at: datetime | None = None
+    digest: str | None = None
+
+    def __init__(self, data: dict, size: int = 0, fetched_at: datetime | None = None, digest: str | None = None) -> None:
+        super().__init__(data)
+        self.size = size
+        self.fetched_at = fetched_at
+        self.digest = digest
+
+
+def payload_digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
     
 
 def get_requests_datas_from_state_data(tgid: int, state_data: dict, type_prefix: str) -> list[ReportRequestData]:
     token = user_tokens_db.get_token(tgid=str(tgid))
     
     report_type = state_data.get("report:type")
-    
-    url_list = all_report_urls.get(type_prefix + report_type)
+    department = state_data.get("report:department")
+    period = state_data.get("report:period")
+
+    return get_requests_datas(token, type_prefix + report_type, department, period)
+
+
+def get_requests_datas(token: str, report_type: str, department: str, period: str) -> list[ReportRequestData]:
+    url_list = all_report_urls.get(report_type)
     if url_list is None:
         raise RuntimeError("No url. Please specify url for \"{report_type}\" report type in urls.py")
     
-    result = []
+    return [get_request_data(token, url, department, period) for url in url_list]
+
+
+def get_request_data(token: str, endpoint: str, department: str, period: str) -> ReportRequestData:
+    # endpoint - url.group из urls.py
+    url_and_group = endpoint.split('.')
+    
+    url = url_and_group[0]
+    group = url_and_group[1] if len(url_and_group) > 1 else None
     
-    for url in url_list:
-        url_and_group = url.split('.')
-        
-        url = url_and_group[0]
-        group = url_and_group[1] if len(url_and_group) > 1 else None
-        
-        departments = state_data.get("report:department")
-        if departments in [ReportAllDepartmentTypes.ALL_DEPARTMENTS_INDIVIDUALLY, ReportAllDepartmentTypes.SUM_DEPARTMENTS_TOTALLY]:
-            departments = []
-        else:
-            departments = [departments]
-        
-        period = state_data.get("report:period")
-        date_from, date_to = get_dates(period=period)
-        
-        data = ReportRequestData(token, url, group, date_from.isoformat(), date_to.isoformat(), departments)
-        result.append(data)
-    return result
+    if department in [ReportAllDepartmentTypes.ALL_DEPARTMENTS_INDIVIDUALLY, ReportAllDepartmentTypes.SUM_DEPARTMENTS_TOTALLY]:
+        departments = []
+    else:
+        departments = [department]
+    
+    date_from, date_to = get_dates(period=period)
+    
+    return ReportRequestData(token, url, group, date_from.isoformat(), date_to.isoformat(), departments, period)
+
+
+# периоды, данные за которые уже не изменятся
+closed_periods = {"last-week", "last-month", "last-year", "last-last-week", "last-last-month", "last-last-year"}
 
 
 def get_dates(period: str) -> tuple[datetime.date, datetime.date]:
@@ -1,4 +1,6 @@
-import requests
+import json
+
+from aiohttp import ClientError, ClientTimeout
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -8,10 +10,14 @@ from aiogram.types import Message
 
 import config as cf
 from src.analytics.db.db import user_tokens_db
+from src.analytics.api_session import get_session
+from src.analytics.auth.login_limiter import LoginAttemptsLimiter
 from src.util.log import logger
 
 router = Router(name=__name__)
 
+login_limiter = LoginAttemptsLimiter(max_attempts=cf.LOGIN_ATTEMPTS_MAX, window=cf.LOGIN_ATTEMPTS_WINDOW)
+
 
 class FSMReportAuthorization(StatesGroup):
     ask_login = State()
@@ -52,31 +58,60 @@ async def authorize(message: Message, state: FSMContext):
     login = (await state.get_data()).get('server_report_login')
     password = message.text
 
+    if not login_limiter.try_attempt(user_id):
+        minutes = int(login_limiter.retry_after(user_id) // 60) + 1
+        await message.answer(f"Слишком много попыток входа, попробуйте через {minutes} мин.")
+        return
+
     msg = await message.answer("Загрузка... ⚙️")
 
-    req = requests.post(
-        url=f"{cf.API_PATH}/api/login",
-        data={
-            "login": login,
-            "password": password
-        }
-    )
+    try:
+        async with get_session().post(
+            url=f"{cf.API_PATH}/api/login",
+            data={
+                "login": login,
+                "password": password
+            },
+            timeout=ClientTimeout(total=cf.API_LOGIN_TIMEOUT),
+        ) as req:
+            status = req.status
+            body = await req.read()
+    except (ClientError, TimeoutError) as e:
+        logger.msg("ERROR", f"Server Report Authorization Error: {e=}")
+        await msg.edit_text("Сервер не отвечает, попробуйте позже")
+        return
 
-    if req.status_code != 200:
-        logger.msg("ERROR", f"Server Report Authorization Error: {req.status_code}, {req.text}")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        data = {}
 
-        if "error" in req.json().keys() and req.json().get("error") == "Wrong login or password":
+    if status != 200 or not data.get("token"):
+        logger.msg("ERROR", f"Server Report Authorization Error: {status}, {body.decode(errors='replace')}")
+
+        if data.get("error") == "Wrong login or password":
             await msg.edit_text("Неверный логин или пароль")
             return
         await msg.edit_text("Ошибка")
         return
 
-    token = req.json().get("token")
-
-    user_tokens_db.insert_user(
-        tgid=str(user_id),
-        token=token
-    )
+    token = data.get("token")
+
+    try:
+        await user_tokens_db.insert_user_async(
+            tgid=str(user_id),
+            token=token
+        )
+    except user_tokens_db.write_errors as e:
+        logger.msg("ERROR", f"Server Report Authorization Error: could not save token, {user_id=}, {e=}")
+        # логин и пароль верные - попытка не засчитывается, но без сохранённого токена пользователь не авторизован
+        user_tokens_db.delete_user(tgid=str(user_id))
+        login_limiter.reset(user_id)
+        await msg.edit_text("Ошибка")
+        return
+    login_limiter.reset(user_id)
 
     logger.info(f"Authorized {user_id=}, {token=}")
 
@@ -0,0 +1,24 @@
+import json
+from base64 import urlsafe_b64decode
+
+
+# токены API - JWT, в payload которых есть userId, slug (организация), iat и exp.
+# подпись не проверяется: её проверяет API при каждом запросе
+def decode_jwt_payload(token: str | None) -> dict | None:
+    if not token:
+        return None
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        data = json.loads(urlsafe_b64decode(payload))
+    except (IndexError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def get_token_exp(token: str | None) -> int | None:
+    # время истечения срока действия токена (unix time)
+    payload = decode_jwt_payload(token)
+    if payload is None or not isinstance(payload.get("exp"), (int, float)):
+        return None
+    return int(payload["exp"])
@@ -0,0 +1,43 @@
+from collections import OrderedDict, deque
+from time import monotonic
+
+
+class LoginAttemptsLimiter:
+    # не больше max_attempts попыток входа одного пользователя за window секунд
+    def __init__(self, max_attempts: int, window: float) -> None:
+        self.max_attempts = max_attempts
+        self.window = window
+        self.rejected = 0
+        # пользователь -> время попыток; по порядку последней попытки, чтобы быстро удалять устаревшие
+        self._attempts: OrderedDict[int, deque[float]] = OrderedDict()
+
+    def try_attempt(self, user_id: int) -> bool:
+        now = monotonic()
+        self._remove_expired(now)
+        attempts = self._attempts.setdefault(user_id, deque())
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if len(attempts) >= self.max_attempts:
+            self.rejected += 1
+            return False
+        attempts.append(now)
+        self._attempts.move_to_end(user_id)
+        return True
+
+    def retry_after(self, user_id: int) -> float:
+        # через сколько секунд можно будет попробовать снова
+        attempts = self._attempts.get(user_id)
+        if not attempts:
+            return 0
+        return max(0.0, attempts[0] + self.window - monotonic())
+
+    def reset(self, user_id: int) -> None:
+        self._attempts.pop(user_id, None)
+
+    def _remove_expired(self, now: float) -> None:
+        # пользователи, все попытки которых старше окна, больше не ограничены - их записи не нужны
+        while self._attempts:
+            user_id, attempts = next(iter(self._attempts.items()))
+            if attempts and attempts[-1] > now - self.window:
+                break
+            del self._attempts[user_id]
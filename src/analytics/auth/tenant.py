@@ -0,0 +1,51 @@
+import hashlib
+
+from .jwt_util import decode_jwt_payload
+
+
+class TenantRegistry:
+    # общие для организации ключи кэша.
+    # payload токена не проверяется на подписи, поэтому организации из токена доверяем
+    # только после того, как API хоть раз принял этот токен
+    def __init__(self) -> None:
+        # токен -> payload
+        self._validated: dict[str, dict] = {}
+        # токен -> отпечаток списка доступных пользователю подразделений
+        self._departments: dict[str, str] = {}
+
+    def validate(self, token: str) -> None:
+        if token not in self._validated:
+            self._validated[token] = decode_jwt_payload(token) or {}
+
+    def forget(self, token: str) -> None:
+        self._validated.pop(token, None)
+        self._departments.pop(token, None)
+
+    def set_departments(self, token: str, department_ids) -> None:
+        self._departments[token] = departments_fingerprint(department_ids)
+
+    def get_report_tenant(self, token: str) -> str:
+        # отчёты общие для пользователей одной организации с одинаковым набором доступных подразделений,
+        # иначе - свои для каждого токена
+        payload = self._validated.get(token)
+        fingerprint = self._departments.get(token)
+        if payload is None or payload.get("slug") is None or fingerprint is None:
+            return token
+        return f"{payload['slug']}:{fingerprint}"
+
+    def get_user_key(self, token: str) -> str:
+        # список подразделений зависит от пользователя, а не от токена (сохраняется после повторного входа)
+        payload = self._validated.get(token)
+        if payload is None or payload.get("slug") is None or payload.get("userId") is None:
+            return token
+        return f"{payload['slug']}:{payload['userId']}"
+
+    def stats(self) -> dict:
+        return {"validated": len(self._validated), "with_departments": len(self._departments)}
+
+
+def departments_fingerprint(department_ids) -> str:
+    return hashlib.sha256(','.join(sorted(map(str, department_ids))).encode()).hexdigest()[:16]
+
+
+tenant_registry = TenantRegistry()
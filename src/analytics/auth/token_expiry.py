@@ -0,0 +1,24 @@
+from aiogram.types import InlineKeyboardMarkup as IKM, InlineKeyboardButton as IKB
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from .tenant import tenant_registry
+from ..db.db import user_tokens_db
+
+from src.util.log import logger
+import config as cf
+
+
+reauth_text = "Срок действия авторизации истёк, необходимо войти заново"
+reauth_kb = IKM(inline_keyboard=[[IKB(text="Войти заново 🔑", callback_data="server_report_reauth")]])
+
+
+async def purge_expired_tokens() -> None:
+    tokens = user_tokens_db.delete_expired_users()
+    for token in tokens:
+        tenant_registry.forget(token)
+    if tokens:
+        logger.info(f"Purged {len(tokens)} expired tokens")
+
+
+def add_jobs(scheduler: AsyncIOScheduler) -> None:
+    scheduler.add_job(purge_expired_tokens, 'interval', seconds=cf.EXPIRED_TOKENS_PURGE_INTERVAL)
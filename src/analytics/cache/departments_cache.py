@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from time import time
+from typing import Awaitable, Callable
+
+from .persistent_cache import persistent_cache
+from src.util.single_flight import SingleFlight
+
+import config as cf
+
+
+@dataclass
+class Departments:
+    names: dict[str, str]          # id -> название
+    display_names: dict[str, str]  # id -> название для заголовков (без номера)
+    expires_at: float
+
+
+class DepartmentsDirectory:
+    # кэш списков подразделений пользователей; одновременные запросы одного пользователя объединяются
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._entries: dict[str, Departments] = {}
+        self._single_flight = SingleFlight()
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[list[dict]]]) -> Departments:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time():
+            return entry
+        return await self._single_flight.do(key, lambda: self._load(key, fetch))
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def _load(self, key: str, fetch: Callable[[], Awaitable[list[dict]]]) -> Departments:
+        # сначала ищем список в кэше на диске (например, после перезапуска)
+        persisted = await persistent_cache.get("departments", key)
+        if persisted is not None and persisted.expires_at > time():
+            entry = self._make_entry(persisted.value, persisted.expires_at)
+            self._store(key, entry)
+            return entry
+
+        departments = await fetch()
+        # пустой список - скорее всего ошибка запроса, не кэшируем
+        if not departments:
+            # пока API недоступно, отдаём последний сохранённый список
+            if persisted is not None:
+                return self._make_entry(persisted.value, persisted.expires_at)
+            return self._make_entry(departments, time() + self.ttl)
+
+        entry = self._make_entry(departments, time() + self.ttl)
+        self._store(key, entry)
+        persistent_cache.set_in_background("departments", key, departments, expires_at=entry.expires_at, fetched_at=time())
+        return entry
+
+    def _store(self, key: str, entry: Departments) -> None:
+        self._remove_expired()
+        self._entries[key] = entry
+
+    @staticmethod
+    def _make_entry(departments: list[dict], expires_at: float) -> Departments:
+        names = {dep["id"]: dep["name"] for dep in departments}
+        return Departments(
+            names=names,
+            display_names={dep_id: name.split('.')[-1] for dep_id, name in names.items()},
+            expires_at=expires_at,
+        )
+
+    def _remove_expired(self) -> None:
+        now = time()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            del self._entries[key]
+
+
+departments_directory = DepartmentsDirectory(ttl=cf.DEPARTMENTS_CACHE_TTL)
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import sqlite3
+import zlib
+
+from asyncio import create_task, to_thread, Task
+from dataclasses import dataclass
+from threading import Lock
+from time import time
+
+from src.util.log import logger
+import config as cf
+
+
+@dataclass
+class PersistentEntry:
+    value: object
+    expires_at: float
+    fetched_at: float
+    size: int
+    data: bytes  # сохранённый JSON
+
+
+class PersistentCache:
+    # кэш на диске (SQLite в режиме WAL), переживает перезапуски бота.
+    # значения хранятся как сжатый JSON; база открывается при первом обращении,
+    # все запросы к ней выполняются в отдельном потоке
+    def __init__(self, path: str, keep_expired: float) -> None:
+        self.path = path
+        # сколько секунд после истечения срока хранить записи (для выдачи устаревших данных)
+        self.keep_expired = keep_expired
+        self.reads = 0
+        self.hits = 0
+        self.writes = 0
+        self._conn: sqlite3.Connection | None = None
+        self._closed = False
+        self._lock = Lock()
+        self._tasks: set[Task] = set()
+
+    async def get(self, namespace: str, key: tuple | str) -> PersistentEntry | None:
+        return await to_thread(self._get, namespace, self._make_key(key))
+
+    def set_in_background(self, namespace: str, key: tuple | str, value: object, expires_at: float, fetched_at: float) -> None:
+        task = create_task(to_thread(self._set, namespace, self._make_key(key), value, expires_at, fetched_at))
+        # держим ссылку на задачу до её завершения
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "hits": self.hits, "writes": self.writes}
+
+    def _get(self, namespace: str, key: str) -> PersistentEntry | None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            self.reads += 1
+            row = conn.execute('''
+            SELECT value, expires_at, fetched_at FROM Cache WHERE namespace == ? AND key == ? AND expires_at > ?
+            ''', (namespace, key, time() - self.keep_expired)).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+        value, expires_at, fetched_at = row
+        data = zlib.decompress(value)
+        return PersistentEntry(value=json.loads(data), expires_at=expires_at, fetched_at=fetched_at, size=len(data), data=data)
+
+    def _set(self, namespace: str, key: str, value: object, expires_at: float, fetched_at: float) -> None:
+        data = zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode())
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute('''
+                INSERT OR REPLACE INTO Cache (namespace, key, value, expires_at, fetched_at) VALUES (?, ?, ?, ?, ?)
+                ''', (namespace, key, data, expires_at, fetched_at))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.msg("ERROR", f"Could not write persistent cache: {namespace=}, {e=}")
+                return
+            self.writes += 1
+            # время от времени удаляем записи, которые уже не понадобятся
+            if self.writes % cf.REPORT_CACHE_DB_PURGE_EVERY == 0:
+                self._purge(conn)
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._conn is not None or self._closed:
+            return self._conn
+        try:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS Cache (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value BLOB NOT NULL,
+            expires_at REAL NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+            )
+            ''')
+            self._purge(conn)
+        except sqlite3.Error as e:
+            logger.msg("ERROR", f"Could not open persistent cache {self.path}: {e=}")
+            return None
+        self._conn = conn
+        return conn
+
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        conn.execute('''
+        DELETE FROM Cache WHERE expires_at <= ?
+        ''', (time() - self.keep_expired,))
+        conn.commit()
+
+    @staticmethod
+    def _make_key(key: tuple | str) -> str:
+        # ключи содержат токены пользователей, поэтому в базе хранится только их хэш
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+persistent_cache = PersistentCache(path=cf.REPORT_CACHE_DB_PATH, keep_expired=cf.REPORT_CACHE_STALE_WINDOW)
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+
+import config as cf
+
+
+class RenderCache:
+    # LRU-кэш готовых текстов отчётов с ограничением по суммарной длине текстов:
+    # повторный показ того же отчёта не составляет тексты заново
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, list[str]] = OrderedDict()
+
+    def get(self, key: tuple) -> list[str] | None:
+        texts = self._entries.get(key)
+        if texts is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # тексты дополняются заголовком при отправке - отдаём копию
+        return list(texts)
+
+    def set(self, key: tuple, texts: list[str]) -> None:
+        size = sum(len(text) for text in texts)
+        if size > self.max_size:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = list(texts)
+        self.size += size
+        # вытесняем давно не использованные тексты
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "size": self.size, "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, key: tuple) -> None:
+        texts = self._entries.pop(key)
+        self.size -= sum(len(text) for text in texts)
+
+
+def render_cache_key(text_type: str, reports: list[dict | None], period: str, department: str, only_negative: bool, recommendations: bool) -> tuple | None:
+    # тексты зависят только от данных отчётов и параметров показа.
+    # None - у отчётов нет digest (например, собраны не из ответов API), такие тексты не кэшируются
+    digests = []
+    for report in reports:
+        if report is None:
+            digests.append(None)
+            continue
+        digest = getattr(report, "digest", None)
+        if digest is None:
+            return None
+        digests.append(digest)
+    return (text_type, tuple(digests), period, department, only_negative, recommendations)
+
+
+render_cache = RenderCache(max_size=cf.RENDER_CACHE_MAX_SIZE)
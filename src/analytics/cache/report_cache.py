@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from time import time
+
+from ..api_util import ReportRequestData, ReportResponse, closed_periods, payload_digest
+from .persistent_cache import persistent_cache
+from ..auth.tenant import tenant_registry
+
+import config as cf
+
+
+@dataclass
+class CacheEntry:
+    value: ReportResponse
+    expires_at: float
+    # загружено заранее (prefetch): до первого обращения хранится недолго,
+    # при первом обращении срок продлевается до full_ttl
+    prefetched: bool = False
+    full_ttl: float = 0
+
+
+class ReportCache:
+    # LRU-кэш ответов API с ограничением по суммарному размеру ответов (в байтах JSON)
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.prefetch_hits = 0
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+
+    def get(self, key: tuple, prefetch: bool = False) -> ReportResponse | None:
+        # prefetch - проверка при загрузке заранее, не считается обращением пользователя
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time():
+            if not prefetch:
+                self.misses += 1
+            return None
+        if prefetch:
+            return entry.value
+        if entry.prefetched:
+            entry.prefetched = False
+            entry.expires_at = time() + entry.full_ttl
+            self.prefetch_hits += 1
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def get_stale(self, key: tuple, max_stale: float) -> ReportResponse | None:
+        # устаревшие записи не удаляются сразу, а вытесняются как давно не использованные;
+        # max_stale - сколько секунд после истечения срока запись ещё можно отдавать
+        entry = self._entries.get(key)
+        if entry is None or time() - entry.expires_at > max_stale:
+            return None
+        self._entries.move_to_end(key)
+        self.stale_hits += 1
+        return entry.value
+
+    def set(self, key: tuple, value: ReportResponse, ttl: float, prefetched: bool = False) -> float | None:
+        # возвращает время истечения срока записи (None - ответ слишком большой для кэша)
+        if value.size > self.max_size:
+            return None
+        if key in self._entries:
+            self._remove(key)
+        if prefetched:
+            # заранее загруженные записи вытесняются первыми
+            entry = CacheEntry(value=value, expires_at=time() + min(ttl, cf.PREFETCH_TTL), prefetched=True, full_ttl=ttl)
+            self._entries[key] = entry
+            self._entries.move_to_end(key, last=False)
+        else:
+            entry = CacheEntry(value=value, expires_at=time() + ttl)
+            self._entries[key] = entry
+        self.size += value.size
+        self._evict()
+        return entry.expires_at
+
+    def restore(self, key: tuple, value: ReportResponse, expires_at: float) -> None:
+        # запись из кэша на диске; срок может быть уже истёкшим (тогда её можно отдать как устаревшую)
+        if key in self._entries or value.size > self.max_size:
+            return
+        self._entries[key] = CacheEntry(value=value, expires_at=expires_at)
+        self.size += value.size
+        self._evict()
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._entries
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "size": self.size, "hits": self.hits, "misses": self.misses, "stale_hits": self.stale_hits, "prefetch_hits": self.prefetch_hits}
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry.value.size
+
+    def _evict(self) -> None:
+        # вытесняем давно не использованные записи
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+
+def report_cache_key(request_data: ReportRequestData) -> tuple:
+    # пользователи одной организации с одинаковыми правами получают общие записи
+    tenant = tenant_registry.get_report_tenant(request_data.token)
+    return (tenant, request_data.url, request_data.group, tuple(request_data.departments), request_data.date_from, request_data.date_to)
+
+
+def report_cache_ttl(period: str | None) -> float:
+    # закрытые периоды (прошлая неделя, месяц, год) больше не меняются
+    if period in closed_periods:
+        return cf.REPORT_CACHE_CLOSED_PERIOD_TTL
+    return cf.REPORT_CACHE_OPEN_PERIOD_TTL
+
+
+async def load_persisted_report(key: tuple) -> None:
+    # при промахе в памяти (например, после перезапуска) ищем отчёт в кэше на диске
+    if key in report_cache:
+        return
+    entry = await persistent_cache.get("reports", key)
+    if entry is None:
+        return
+    value = ReportResponse(entry.value, size=entry.size, fetched_at=datetime.fromtimestamp(entry.fetched_at, tz=cf.TIMEZONE), digest=payload_digest(entry.data))
+    report_cache.restore(key, value, expires_at=entry.expires_at)
+
+
+def persist_report(key: tuple, value: ReportResponse, expires_at: float) -> None:
+    fetched_at = value.fetched_at.timestamp() if value.fetched_at is not None else time()
+    persistent_cache.set_in_background("reports", key, value, expires_at=expires_at, fetched_at=fetched_at)
+
+
+report_cache = ReportCache(max_size=cf.REPORT_CACHE_MAX_SIZE)
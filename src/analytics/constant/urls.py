@@ -12,4 +12,7 @@ all_report_urls = {
     "inventory": ["inventory.store"],
     "markup": ["markup.store"],
     "analysis.markup": ["markup.store", "markup.dish"]
-}
\ No newline at end of file
+}
+
+# url.group, отчёт по всей сети которых можно разделить по подразделениям (строки "data" подписаны подразделением)
+department_split_endpoints = {"revenue", "turnover.store", "inventory.store", "markup.store"}
@@ -1,6 +1,6 @@
 from aiogram.types import InlineKeyboardButton as IKB
 
-from ..api import get_departments
+from ..api import get_departments, get_department_display_names
 from ..handlers.types.report_all_departments_types import ReportAllDepartmentTypes
 
 
@@ -13,6 +13,15 @@ async def all_departments(tgid: int) -> dict:
     return departments
 
 
+async def all_department_display_names(tgid: int) -> dict:
+    departments: dict = await get_department_display_names(tgid)
+    departments.update({
+        ReportAllDepartmentTypes.ALL_DEPARTMENTS_INDIVIDUALLY: "Вся сеть (по объектам отдельно)",
+        ReportAllDepartmentTypes.SUM_DEPARTMENTS_TOTALLY: "Вся сеть (итого по объектам)"
+    })
+    return departments
+
+
 all_periods = {
     "last-day": "Вчерашний день",
     "this-week": "Текущая неделя",
@@ -44,6 +53,16 @@ all_types = {
 }
 
 
+# виды отчётов (report:type), доступные в каждой ветке
+branch_types = {
+    "revenue": ["revenue"],
+    "writeoff": ["inventory", "write-off"],
+    "losses": ["losses", "loss-forecast"],
+    "foodcost": ["food-cost", "markup"],
+    "turnover": ["turnover"],
+}
+
+
 all_menu_buttons = [
     IKB(text="Показатели 📊 ", callback_data="report:show_parameters"),
     IKB(text="Анализ 🔎", callback_data="report:show_analysis"),
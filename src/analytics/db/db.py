@@ -1,67 +1,143 @@
 import sqlite3
+from asyncio import to_thread
+from contextlib import contextmanager
+from queue import Queue
+
 import config as cf
 from src.util.log import logger
+from ..auth.jwt_util import get_token_exp
+from .token_store import TokenStore, MemoryTokenStore, User
+from .kv_token_store import KVTokenStore
 
 
-class UserTokensDB:
-    def __init__(self, path):
-        # Устанавливаем соединение с базой данных
-        self.conn = sqlite3.connect(path)
-        self.cursor = self.conn.cursor()
+# запросы не меняются, поэтому sqlite3 компилирует каждый один раз на соединение (кэш запросов соединения)
+SELECT_USERS_SQL = '''
+SELECT tgid, token, exp FROM Users
+'''
+UPSERT_USER_SQL = '''
+INSERT OR REPLACE INTO Users (tgid, token, exp) VALUES (?, ?, ?)
+'''
+DELETE_USER_SQL = '''
+DELETE FROM Users WHERE tgid == ?
+'''
+
+
+class SQLiteConnectionPool:
+    # несколько соединений с базой в режиме WAL: чтение не ждёт записи
+    def __init__(self, path: str, size: int) -> None:
         self.path = path
+        self._connections: Queue[sqlite3.Connection] = Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
 
-    def insert_user(self, tgid: str, token: str) -> None:
-        self.cursor.execute('''
-        INSERT INTO Users (tgid, token) VALUES (?, ?)
-        ''', (tgid, token,))
-        self.conn.commit()
-
-    def get_token(self, tgid: str) -> str | None:
-        self.cursor.execute('''
-        SELECT * FROM Users WHERE tgid == ?
-        ''', (tgid,))
-        result = self.cursor.fetchone()
-        if result is None:
-            return None
-        return result[1]
-
-    def has_tgid(self, tgid: str) -> bool:
-        return self.get_token(tgid) is not None
-
-    def delete_user(self, tgid: str) -> bool:
-        self.cursor.execute('''
-        DELETE FROM Users WHERE tgid == ?
-        ''', (tgid,))
-        self.conn.commit()
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get().close()
+
+
+class UserTokensDB(TokenStore):
+    # токены в SQLite: все читаются при запуске, изменения записываются пачками в отдельном потоке
+    write_errors = (sqlite3.Error,)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.pool = SQLiteConnectionPool(path, size=cf.USER_TOKENS_DB_POOL_SIZE)
 
     def create_table(self):
-        # Создаем таблицу Users
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Users (
-        tgid TEXT PRIMARY KEY,
-        token TEXT NOT NULL
-        )
+        with self.pool.connection() as conn:
+            # Создаем таблицу Users
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS Users (
+            tgid TEXT PRIMARY KEY,
+            token TEXT NOT NULL,
+            exp INTEGER
+            )
+            ''')
+            self.add_exp_column(conn)
+            conn.execute('''
+            CREATE INDEX IF NOT EXISTS UsersExp ON Users (exp)
+            ''')
+            conn.commit()
+
+    def add_exp_column(self, conn: sqlite3.Connection) -> None:
+        # в старых базах нет срока действия токенов (exp из JWT) - добавляем и заполняем
+        columns = [row[1] for row in conn.execute('''
+        PRAGMA table_info(Users)
+        ''')]
+        if "exp" in columns:
+            return
+        conn.execute('''
+        ALTER TABLE Users ADD COLUMN exp INTEGER
         ''')
-        # Сохраняем изменения и закрываем соединение
-        self.conn.commit()
+        users = conn.execute('''
+        SELECT tgid, token FROM Users
+        ''').fetchall()
+        conn.executemany('''
+        UPDATE Users SET exp = ? WHERE tgid == ?
+        ''', [(get_token_exp(token), tgid) for tgid, token in users])
+
+    def load(self) -> None:
+        with self.pool.connection() as conn:
+            self._tokens = {tgid: (token, exp) for tgid, token, exp in conn.execute(SELECT_USERS_SQL)}
 
     def close(self):
-        self.conn.close()
+        super().close()
+        # несохранённые изменения записываем сразу
+        batch, self._pending = self._pending, {}
+        self._write_batch_sync(batch)
+        self.pool.close()
+
+    async def _write_batch(self, batch: dict[str, User | None]) -> None:
+        await to_thread(self._write_batch_sync, batch)
+
+    def _write_outside_loop(self) -> None:
+        batch, self._pending = self._pending, {}
+        self._write_batch_sync(batch)
+
+    def _write_batch_sync(self, batch: dict[str, User | None]) -> None:
+        if not batch:
+            return
+        with self.pool.connection() as conn:
+            with conn:
+                conn.executemany(UPSERT_USER_SQL, [(tgid, *user) for tgid, user in batch.items() if user is not None])
+                conn.executemany(DELETE_USER_SQL, [(tgid,) for tgid, user in batch.items() if user is None])
 
 
 def create_database(path: str) -> UserTokensDB:
     try:
         db = UserTokensDB(path)
         db.create_table()
+        db.load()
         return db
     except sqlite3.OperationalError:
         logger.msg("ERROR", f"Please create directory for the database: {path}")
         raise BaseException(f"Please create directory for the database: {path}")
 
 
-user_tokens_db = create_database(cf.USER_TOKENS_DB_PATH)
+def create_token_store() -> TokenStore:
+    # несколько процессов бота могут использовать общие токены через сетевое хранилище ("kv")
+    if cf.TOKEN_STORE_BACKEND == "kv":
+        return KVTokenStore(cf.TOKEN_STORE_KV_HOST, cf.TOKEN_STORE_KV_PORT)
+    if cf.TOKEN_STORE_BACKEND == "memory":
+        return MemoryTokenStore()
+    return create_database(cf.USER_TOKENS_DB_PATH)
+
+
+user_tokens_db = create_token_store()
 
 
-def get_user_tokens_db() -> UserTokensDB | None:
+def get_user_tokens_db() -> TokenStore | None:
     global user_tokens_db
     return user_tokens_db
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import json
+from asyncio import StreamReader, StreamWriter
+
+from src.util.log import logger
+from .kv_token_store import KV_LINE_LIMIT, encode_message
+
+
+class KVServer:
+    # простое сетевое хранилище токенов для нескольких процессов бота (и для проверок).
+    # данные только в памяти; в рабочем окружении его заменяет постоянное хранилище с тем же протоколом
+    def __init__(self) -> None:
+        self.items: dict[str, list] = {}
+        self.seq = 0  # номер последнего изменения
+        self._clients: set[StreamWriter] = set()
+
+    async def serve(self, host: str, port: int) -> asyncio.Server:
+        return await asyncio.start_server(self.handle_client, host, port, limit=KV_LINE_LIMIT)
+
+    async def handle_client(self, reader: StreamReader, writer: StreamWriter) -> None:
+        self._clients.add(writer)
+        try:
+            writer.write(encode_message({"op": "snapshot", "seq": self.seq, "items": self.items}))
+            await writer.drain()
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get("op") != "batch":
+                    continue
+                self.items.update(message.get("set", {}))
+                for key in message.get("delete", []):
+                    self.items.pop(key, None)
+                self.seq += 1
+                message["seq"] = self.seq
+                # изменения получают все клиенты, отправитель - как подтверждение записи
+                await self.broadcast(message)
+        except (OSError, ValueError) as e:
+            logger.msg("ERROR", f"KV client error: {e=}")
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    async def broadcast(self, message: dict) -> None:
+        data = encode_message(message)
+        # сначала сообщение попадает в буферы всех клиентов, затем ждём отправки:
+        # так все клиенты получают изменения в порядке seq
+        clients = list(self._clients)
+        for client in clients:
+            client.write(data)
+        for client in clients:
+            try:
+                await client.drain()
+            except OSError:
+                self._clients.discard(client)
+
+
+async def main(host: str, port: int) -> None:
+    server = await KVServer().serve(host, port)
+    logger.info(f"KV server is running on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Token store server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7400)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,160 @@
+import json
+from asyncio import Future, StreamReader, StreamWriter, Task, create_task, get_running_loop, open_connection, sleep, wait_for
+from uuid import uuid4
+
+from src.util.log import logger
+from .token_store import TokenStore, User
+import config as cf
+
+
+# сообщения - JSON, по одному в строке:
+#   сервер -> клиент: {"op": "snapshot", "seq": номер последнего изменения, "items": {tgid: [token, exp]}} при подключении,
+#                     затем {"op": "batch", "seq": номер, ...} - изменения от всех клиентов в порядке записи на сервере
+#   клиент -> сервер: {"op": "batch", "origin": id клиента, "id": номер, "set": {tgid: [token, exp]}, "delete": [tgid]}
+KV_LINE_LIMIT = 16 * 1024 * 1024  # bytes, снимок всех токенов передаётся одной строкой
+
+
+def encode_message(message: dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode() + b"\n"
+
+
+class KVTokenStore(TokenStore):
+    # токены в общем сетевом хранилище: несколько процессов бота видят одни и те же токены.
+    # при подключении загружается снимок, затем сервер присылает все изменения - чтение остаётся в памяти
+    write_errors = (OSError,)
+
+    def __init__(self, host: str, port: int) -> None:
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.client_id = uuid4().hex
+        self._reader: StreamReader | None = None
+        self._stream: StreamWriter | None = None
+        self._read_task: Task | None = None
+        self._batch_id = 0
+        # номер пачки -> ожидание подтверждения от сервера
+        self._acks: dict[int, Future] = {}
+        # tgid -> номер последней отправленной, но ещё не подтверждённой своей пачки с этим пользователем
+        self._in_flight: dict[str, int] = {}
+        # tgid -> seq последнего применённого изменения; для остальных - seq снимка
+        self._versions: dict[str, int] = {}
+        self._snapshot_seq = 0
+
+    async def start(self) -> None:
+        await self._connect()
+        self._read_task = create_task(self._read_loop())
+
+    def close(self) -> None:
+        super().close()
+        if self._read_task is not None:
+            self._read_task.cancel()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    async def _write_batch(self, batch: dict[str, User | None]) -> None:
+        if self._stream is None:
+            raise ConnectionError("Token store is not connected")
+        self._batch_id += 1
+        batch_id = self._batch_id
+        ack = get_running_loop().create_future()
+        self._acks[batch_id] = ack
+        for tgid in batch:
+            self._in_flight[tgid] = batch_id
+        try:
+            self._stream.write(encode_message({
+                "op": "batch",
+                "origin": self.client_id,
+                "id": batch_id,
+                "set": {tgid: user for tgid, user in batch.items() if user is not None},
+                "delete": [tgid for tgid, user in batch.items() if user is None],
+            }))
+            await self._stream.drain()
+            await wait_for(ack, timeout=cf.TOKEN_STORE_KV_TIMEOUT)
+        finally:
+            self._acks.pop(batch_id, None)
+            # неподтверждённая пачка возвращается в _pending (TokenStore.flush)
+            self._forget_in_flight(batch, batch_id)
+
+    async def _connect(self) -> None:
+        self._reader, self._stream = await wait_for(open_connection(self.host, self.port, limit=KV_LINE_LIMIT), timeout=cf.TOKEN_STORE_KV_TIMEOUT)
+        snapshot = json.loads(await wait_for(self._reader.readline(), timeout=cf.TOKEN_STORE_KV_TIMEOUT))
+        self._tokens = {tgid: tuple(user) for tgid, user in snapshot["items"].items()}
+        self._snapshot_seq = snapshot.get("seq", 0)
+        self._versions = {}
+        # изменения, ещё не отправленные на сервер, новее снимка
+        for tgid, user in self._pending.items():
+            if user is None:
+                self._tokens.pop(tgid, None)
+            else:
+                self._tokens[tgid] = user
+        logger.info(f"Token store connected: {self.host}:{self.port}, users={len(self._tokens)}")
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                line = await self._reader.readline()
+                if not line:
+                    raise ConnectionError("Token store connection closed")
+                self._apply(json.loads(line))
+            except (OSError, ValueError) as e:
+                logger.msg("ERROR", f"Token store connection lost: {e=}")
+                await self._reconnect()
+
+    async def _reconnect(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        for ack in self._acks.values():
+            if not ack.done():
+                ack.set_exception(ConnectionError("Token store connection lost"))
+        delay = 1
+        while True:
+            await sleep(delay)
+            try:
+                await self._connect()
+            except (OSError, ValueError, KeyError) as e:
+                logger.msg("ERROR", f"Could not connect to token store: {e=}")
+                delay = min(delay * 2, 60)
+                continue
+            # изменения, которые не удалось записать до разрыва
+            if self._pending and self._pending_event is not None:
+                self._pending_event.set()
+            return
+
+    def _apply(self, message: dict) -> None:
+        if message.get("op") != "batch":
+            return
+        seq = message.get("seq", 0)
+        changes = message.get("set", {}) | dict.fromkeys(message.get("delete", []))
+        if message.get("origin") == self.client_id:
+            # свои изменения уже в памяти; после подтверждения изменения с сервера с большим seq новее их
+            for tgid in changes:
+                self._versions[tgid] = max(seq, self._version(tgid))
+            self._forget_in_flight(changes, message.get("id"))
+            ack = self._acks.get(message.get("id"))
+            if ack is not None and not ack.done():
+                ack.set_result(None)
+            return
+        for tgid, user in changes.items():
+            if not self._accepts(tgid, seq):
+                continue
+            self._versions[tgid] = seq
+            if user is None:
+                self._tokens.pop(tgid, None)
+            else:
+                self._tokens[tgid] = tuple(user)
+
+    def _accepts(self, tgid: str, seq: int) -> bool:
+        # свои изменения, ещё не отправленные или не подтверждённые, окажутся на сервере позже - они новее.
+        # изменения с seq не больше уже применённого устарели
+        return tgid not in self._pending and tgid not in self._in_flight and seq > self._version(tgid)
+
+    def _version(self, tgid: str) -> int:
+        return self._versions.get(tgid, self._snapshot_seq)
+
+    def _forget_in_flight(self, tgids, batch_id: int | None) -> None:
+        for tgid in tgids:
+            # более новая своя пачка с тем же пользователем ещё ждёт подтверждения
+            if self._in_flight.get(tgid) == batch_id:
+                del self._in_flight[tgid]
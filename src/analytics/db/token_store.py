@@ -0,0 +1,145 @@
+from abc import ABC, abstractmethod
+from asyncio import Event, Lock, Task, create_task, get_running_loop, sleep
+from time import time
+
+import config as cf
+from src.util.log import logger
+from ..auth.jwt_util import get_token_exp
+from ..auth.tenant import tenant_registry
+
+
+# tgid -> (token, exp); None - пользователь удалён
+User = tuple[str, int | None]
+
+
+class TokenStore(ABC):
+    # хранилище токенов пользователей. токены всегда читаются из памяти,
+    # изменения записываются в хранилище (_write_batch) пачками в фоне
+    write_errors: tuple[type[Exception], ...] = ()
+
+    def __init__(self) -> None:
+        self._tokens: dict[str, User] = {}
+        self._pending: dict[str, User | None] = {}
+        self._pending_event: Event | None = None
+        self._writer: Task | None = None
+        # пачки записываются по очереди, чтобы более старая не перезаписала новую
+        self._flush_lock = Lock()
+
+    async def start(self) -> None:
+        # подключение к хранилищу, которому нужен цикл событий
+        pass
+
+    def insert_user(self, tgid: str, token: str) -> None:
+        tgid = str(tgid)
+        self._tokens[tgid] = (token, get_token_exp(token))
+        self._schedule_write(tgid, self._tokens[tgid])
+
+    async def insert_user_async(self, tgid: str, token: str) -> None:
+        # дожидается записи в хранилище, не блокируя цикл событий
+        self.insert_user(tgid, token)
+        await self.flush()
+
+    def get_token(self, tgid: str) -> str | None:
+        user = self._tokens.get(str(tgid))
+        if user is None:
+            return None
+        return self._trusted(user[0])
+
+    def get_all_tokens(self) -> list[tuple[str, str]]:
+        # только действующие токены
+        min_exp = time() + cf.TOKEN_EXPIRY_LEEWAY
+        return [(tgid, self._trusted(token)) for tgid, (token, exp) in self._tokens.items() if exp is None or exp > min_exp]
+
+    def has_tgid(self, tgid: str) -> bool:
+        # пользователь с истёкшим токеном считается неавторизованным
+        user = self._tokens.get(str(tgid))
+        return user is not None and (user[1] is None or user[1] > time() + cf.TOKEN_EXPIRY_LEEWAY)
+
+    def delete_expired_users(self) -> list[str]:
+        # возвращает удалённые токены
+        now = time()
+        expired = [tgid for tgid, (token, exp) in self._tokens.items() if exp is not None and exp <= now]
+        tokens = [self._tokens[tgid][0] for tgid in expired]
+        for tgid in expired:
+            self.delete_user(tgid)
+        return tokens
+
+    def delete_user(self, tgid: str) -> None:
+        tgid = str(tgid)
+        self._tokens.pop(tgid, None)
+        self._schedule_write(tgid, None)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                await self._write_batch(batch)
+            except self.write_errors:
+                # не записанные изменения попробуем записать со следующей пачкой
+                self._pending = batch | self._pending
+                raise
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+
+    async def aclose(self) -> None:
+        # при остановке бота записываем оставшиеся изменения
+        try:
+            await self.flush()
+        except self.write_errors as e:
+            logger.msg("ERROR", f"Could not write user tokens: {e=}")
+        self.close()
+
+    def stats(self) -> dict:
+        return {"users": len(self._tokens), "pending": len(self._pending)}
+
+    @abstractmethod
+    async def _write_batch(self, batch: dict[str, User | None]) -> None:
+        # записывает изменения в хранилище; ошибки записи - из write_errors
+        ...
+
+    @staticmethod
+    def _trusted(token: str) -> str:
+        # в хранилище попадают только токены, выданные API при входе, поэтому организации из них можно доверять
+        # сразу, в том числе после перезапуска (иначе ключи общего кэша меняются до первого ответа API)
+        tenant_registry.validate(token)
+        return token
+
+    def _write_outside_loop(self) -> None:
+        # вне цикла событий (скрипты) изменения остаются до следующей записи
+        pass
+
+    def _schedule_write(self, tgid: str, user: User | None) -> None:
+        self._pending[tgid] = user
+        try:
+            get_running_loop()
+        except RuntimeError:
+            self._write_outside_loop()
+            return
+        if self._writer is None or self._writer.done():
+            self._pending_event = Event()
+            self._writer = create_task(self._write_pending())
+        self._pending_event.set()
+
+    async def _write_pending(self) -> None:
+        while True:
+            await self._pending_event.wait()
+            self._pending_event.clear()
+            # собираем изменения за небольшой промежуток в одну запись
+            await sleep(cf.USER_TOKENS_DB_WRITE_DELAY)
+            try:
+                await self.flush()
+            except self.write_errors as e:
+                logger.msg("ERROR", f"Could not write user tokens: {e=}")
+
+
+class MemoryTokenStore(TokenStore):
+    # токены только в памяти процесса (для разработки и проверок), после перезапуска теряются
+    async def _write_batch(self, batch: dict[str, User | None]) -> None:
+        pass
+
+    def _write_outside_loop(self) -> None:
+        self._pending.clear()
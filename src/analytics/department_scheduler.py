@@ -0,0 +1,39 @@
+from asyncio import FIRST_COMPLETED, Semaphore, Task, create_task, wait
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import config as cf
+
+
+class ReportNotLoadedError(Exception):
+    pass
+
+
+async def iter_departments(
+    departments: dict[str, str],
+    fetch: Callable[[str, str], Awaitable[Any]],
+    concurrency: int = cf.DEPARTMENTS_CONCURRENCY,
+) -> AsyncIterator[tuple[str, Any]]:
+    # запускает fetch(dep_id, dep_name) для всех подразделений параллельно (не более concurrency за раз)
+    # и отдаёт результаты в порядке подразделений, как только готовы они и все предыдущие.
+    # при первой ошибке остальные задачи отменяются, а ошибка пробрасывается
+    semaphore = Semaphore(concurrency)
+
+    async def run(dep_id: str, dep_name: str) -> Any:
+        async with semaphore:
+            return await fetch(dep_id, dep_name)
+
+    tasks: list[tuple[str, Task]] = [(dep_id, create_task(run(dep_id, dep_name))) for dep_id, dep_name in departments.items()]
+    pending = {task for _, task in tasks}
+
+    try:
+        for dep_id, task in tasks:
+            while not task.done():
+                done, pending = await wait(pending, return_when=FIRST_COMPLETED)
+                for done_task in done:
+                    if not done_task.cancelled() and done_task.exception() is not None:
+                        raise done_task.exception()
+            pending.discard(task)
+            yield dep_id, task.result()
+    finally:
+        for _, task in tasks:
+            task.cancel()
@@ -0,0 +1,50 @@
+from .api_util import ReportResponse
+
+
+def department_number(label: str) -> str:
+    # "1.Бар Пушкинская 192" -> "1"
+    return label.split('.')[0].strip()
+
+
+def split_digest(digest: str | None, dep_id: str) -> str | None:
+    # часть отчёта по всей сети однозначно определяется отчётом и подразделением
+    if digest is None:
+        return None
+    return f"{digest}:{dep_id}"
+
+
+def split_reports_by_departments(reports: list[dict], departments: dict[str, str]) -> dict[str, list[dict]] | None:
+    # делит отчёты по всей сети на отчёты по подразделениям по номеру в начале "label" строк.
+    # подразделения без строк в каком-либо отчёте не попадают в результат.
+    # возвращает None, если строки нельзя однозначно сопоставить подразделениям
+    dep_ids_by_number: dict[str, str] = {}
+    for dep_id, dep_name in departments.items():
+        number = department_number(dep_name)
+        if not number or number in dep_ids_by_number:
+            return None
+        dep_ids_by_number[number] = dep_id
+
+    partitions: list[dict[str, list[dict]]] = []
+    for report in reports:
+        rows_by_department: dict[str, list[dict]] = {}
+        for row in report["data"]:
+            dep_id = dep_ids_by_number.get(department_number(row.get("label") or ""))
+            if dep_id is None:
+                return None
+            rows_by_department.setdefault(dep_id, []).append(row)
+        partitions.append(rows_by_department)
+
+    result = {}
+    for dep_id in departments:
+        if not all(dep_id in rows_by_department for rows_by_department in partitions):
+            continue
+        # "sum" относится ко всей сети, в отчёт подразделения не переносим
+        result[dep_id] = [
+            ReportResponse(
+                {key: value for key, value in report.items() if key != "sum"} | {"data": rows_by_department[dep_id]},
+                fetched_at=getattr(report, "fetched_at", None),
+                digest=split_digest(getattr(report, "digest", None), dep_id),
+            )
+            for report, rows_by_department in zip(reports, partitions)
+        ]
+    return result
@@ -5,12 +5,20 @@ from aiogram.fsm.context import FSMContext
 from .handlers import clear_report_state_data
 from .layout_util import enter_step
 from .types.msg_data import MsgData
+from ..auth.token_expiry import reauth_text, reauth_kb
+from ..db.db import user_tokens_db
 
 router = Router(name=__name__)
 
 
 @router.callback_query(F.data == "analytics_report_begin")
 async def analytics_begin_handler(query: CallbackQuery, state: FSMContext) -> None:
+    # с истёкшим токеном API всё равно не ответит - сразу предлагаем войти заново
+    if not user_tokens_db.has_tgid(str(query.from_user.id)):
+        await query.message.edit_text(text=reauth_text, reply_markup=reauth_kb)
+        await query.answer()
+        return
+
     await clear_report_state_data(state)
 
     await enter_step(msg_data=MsgData(msg=query.message, state=state, tgid=query.from_user.id), branch="enter_department", step=0)
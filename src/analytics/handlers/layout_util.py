@@ -1,5 +1,6 @@
 from ..handlers.types.msg_data import MsgData
 from ..constant.layout import layout
+from ..prefetch import report_prefetcher
 
 from src.util.log import logger
 
@@ -21,6 +22,11 @@ async def enter_step(msg_data: MsgData, step: int, branch: str) -> None:
     await msg_data.state.update_data({"report:messages_to_delete": []})
     
     await msg_data.state.update_data({"report:branch": branch, "report:step": step})
+
+    # пока пользователь выбирает, загружаем вероятные отчёты заранее
+    if branch != "enter_department":
+        report_prefetcher.schedule(msg_data.tgid, state_data | {"report:branch": branch, "report:step": step})
+
     msg_func = get_msg_func(step, branch)
     await msg_func(msg_data)
 
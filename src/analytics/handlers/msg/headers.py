@@ -1,15 +1,20 @@
+from datetime import datetime
+
 from aiogram.utils.formatting import Bold, Text, as_marked_section, as_key_value
 
 from ..types.msg_data import MsgData
-from ...constant.variants import all_departments, all_branches, all_types, all_periods
+from ...constant.variants import all_department_display_names, all_branches, all_types, all_periods
+
+import config as cf
 
 # make header
-async def make_header(msg_data: MsgData) -> str:
+async def make_header(msg_data: MsgData, data_as_of: datetime | None = None) -> str:
     state_data = await msg_data.state.get_data()
-    return await make_header_from_state(state_data, msg_data.tgid)
+    return await make_header_from_state(state_data, msg_data.tgid, data_as_of)
     
 
-async def make_header_from_state(state_data: dict, tgid: int) -> str:
+# data_as_of - время получения данных, если отчёт построен по устаревшим данным
+async def make_header_from_state(state_data: dict, tgid: int, data_as_of: datetime | None = None) -> str:
     headers = []
     
     department = state_data.get("report:department")
@@ -19,13 +24,13 @@ async def make_header_from_state(state_data: dict, tgid: int) -> str:
     
     assert tgid is not None, "tgid is not specified"
     
-    department = (await all_departments(tgid)).get(department)
+    department = (await all_department_display_names(tgid)).get(department)
     branch = all_branches.get(branch)
     report_type = all_types.get(report_type)
     period = all_periods.get(period)
     
     if department is not None:
-        headers.append(f"📍 <code>Объект:</code> <b>{department.split('.')[-1]}</b>")
+        headers.append(f"📍 <code>Объект:</code> <b>{department}</b>")
         
     if branch is not None and state_data.get("report:type") == state_data.get("report:branch"):
         headers.append(f"📊 <code>Отчёт:</code> <b>{branch}</b>")
@@ -35,6 +40,9 @@ async def make_header_from_state(state_data: dict, tgid: int) -> str:
         
     if period is not None:
         headers.append(f"📅 <code>Период:</code> <b>{period}</b>")
+
+    if data_as_of is not None:
+        headers.append(f"🕒 <code>Данные на:</code> <b>{data_as_of.astimezone(cf.TIMEZONE).strftime('%d.%m.%Y %H:%M')}</b>")
         
     return "\n".join(headers)
     
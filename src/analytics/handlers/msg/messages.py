@@ -1,3 +1,6 @@
+from asyncio import get_running_loop
+from contextlib import aclosing
+
 from aiogram.types import Message, InlineKeyboardMarkup as IKM, InlineKeyboardButton as IKB
 from aiogram.fsm.context import FSMContext
 from aiogram.enums.parse_mode import ParseMode
@@ -5,15 +8,24 @@ from aiogram.enums.parse_mode import ParseMode
 from .msg_util import clear_report_state_data, set_input_state, make_kb, make_kb_report_menu, back_current_step_btn, add_messages_to_delete
 from ..types.msg_data import MsgData
 from .headers import make_header, make_header_from_state
-from ...api import get_reports, get_reports_from_state, get_departments
+from ...api import get_reports, get_reports_from_state, get_departments, get_reports_data_as_of
 from ...api_util import get_requests_datas_from_state_data, ReportRequestData
+from ...department_scheduler import iter_departments, ReportNotLoadedError
+from ...planner import get_split_endpoint_reports, get_text_reports
+from ...prefetch import report_prefetcher
+from ...cache.render_cache import render_cache, render_cache_key
+from ...auth.token_expiry import reauth_text, reauth_kb
+from ...db.db import user_tokens_db
 from ...constant.variants import all_departments, all_branches, all_types, all_periods, all_menu_buttons
 from ..text.recommendations import recommendations
 from ..text.revenue_texts import revenue_analysis_text
-from ..text.texts import text_functions
+from ..text.texts import text_functions, partial_report_types
 from ..types.text_data import TextData
 from ..types.report_all_departments_types import ReportAllDepartmentTypes
 
+from src.util.log import logger
+import config as cf
+
 
 # msg functions
 async def department_msg(msg_data: MsgData) -> None:
@@ -89,14 +101,24 @@ async def test_msg(msg_data: MsgData) -> None:
       
 # menu messages
 async def parameters_msg(msg_data: MsgData, type_prefix: str = "", only_negative: bool = False, recommendations: bool = False) -> None:
+    # общий срок на все запросы отчёта, в том числе по подразделениям отдельно
+    deadline = get_running_loop().time() + cf.REPORT_DEADLINE
+
     state_data = await msg_data.state.get_data()
     
     report_type = state_data.get("report:type")
     department = state_data.get("report:department")
     period = state_data.get("report:period")
+
+    # токен мог истечь, пока пользователь выбирал параметры
+    if not user_tokens_db.has_tgid(str(msg_data.tgid)):
+        await msg_data.msg.edit_text(text=reauth_text, reply_markup=reauth_kb)
+        return
     
     loading_msg = await msg_data.msg.edit_text(text="Загрузка... ⏳")
 
+    report_prefetcher.record(msg_data.tgid, type_prefix + report_type, period)
+
     back_kb = IKM(inline_keyboard=[[back_current_step_btn]])
 
     # если "один объект" или "вся сеть (итого)"
@@ -105,53 +127,67 @@ async def parameters_msg(msg_data: MsgData, type_prefix: str = "", only_negative
             tgid=msg_data.tgid, 
             state_data=state_data,
             type_prefix=type_prefix,
+            deadline=deadline,
         )
 
-        if None in reports:
+        if not is_report_loaded(reports, type_prefix + report_type):
             await loading_msg.edit_text(text="Не удалось загрузить отчёт", reply_markup=back_kb)
             return
         
-        header = await make_header(msg_data)
+        header = await make_header(msg_data, data_as_of=get_reports_data_as_of(reports, period))
 
         await send_one_texts(reports, msg_data, report_type, type_prefix, period, department, only_negative, recommendations, header=header)
     else: # если "вся сеть (по объектам отдельно)"
         copied_state_data = state_data.copy()
 
-        department_reports = []  # список, где хранится отчёт и заголовок отдельно для каждого подразделения
-
-        # берём отдельно каждое подразделения, и получаем для него отчёт
-        for dep_id, dep_name in (await get_departments(msg_data.tgid)).items():
-            print(f">>> {dep_name=}")
-
-            copied_state_data["report:department"] = dep_id
+        departments = await get_departments(msg_data.tgid)
+        token = user_tokens_db.get_token(tgid=str(msg_data.tgid))
 
-            reports = await get_reports_from_state(
-                tgid=msg_data.tgid, 
-                state_data=copied_state_data,
-                type_prefix=type_prefix,
-            )
+        # по возможности загружаем отчёты по всей сети один раз и делим их по подразделениям
+        split_reports = {}
+        if cf.SPLIT_NETWORK_REPORTS:
+            split_reports = await get_split_endpoint_reports(token, type_prefix + report_type, departments, period, deadline=deadline)
 
-            if None in reports:
+            if split_reports is None:
                 await loading_msg.edit_text(text="Не удалось загрузить отчёт", reply_markup=back_kb)
                 return
-            
-            header = await make_header_from_state(copied_state_data, msg_data.tgid)
 
-            department_report = {"reports": reports, "header": header}
-            department_reports.append(department_report)
+        # получает отчёт и заголовок отдельно для подразделения
+        async def fetch_department_report(dep_id: str, dep_name: str) -> dict:
+            logger.debug(f"Department report: {dep_name=}")
 
+            dep_state_data = copied_state_data | {"report:department": dep_id}
 
-        # общий заголовок
-        header = (await make_header(msg_data)) + "\n\n⬇️⬇️⬇️"
+            # запрашиваются только url.group, которых нет в отчётах по всей сети
+            text_reports = await get_text_reports(token, [type_prefix + report_type], dep_id, period, known=split_reports.get(dep_id), deadline=deadline)
+            reports = text_reports[type_prefix + report_type]
 
-        header_msg = await msg_data.msg.answer(text=header)
-        await add_messages_to_delete(msg_data=msg_data, messages=[header_msg])
-
-        # высылаем тексты
-        for department_report in department_reports:
-            reports = department_report["reports"]
-            header = department_report["header"]
-            await send_one_texts(reports, msg_data, report_type, type_prefix, period, department, only_negative, recommendations, header=header)
+            if not is_report_loaded(reports, type_prefix + report_type):
+                raise ReportNotLoadedError(dep_id)
+            
+            header = await make_header_from_state(dep_state_data, msg_data.tgid, data_as_of=get_reports_data_as_of(reports, period))
+
+            return {"reports": reports, "header": header}
+
+        # подразделения загружаются параллельно, тексты высылаются по порядку по мере готовности
+        header_sent = False
+        try:
+            async with aclosing(iter_departments(departments, fetch_department_report)) as department_reports:
+                async for dep_id, department_report in department_reports:
+                    # общий заголовок
+                    if not header_sent:
+                        header = (await make_header(msg_data)) + "\n\n⬇️⬇️⬇️"
+
+                        header_msg = await msg_data.msg.answer(text=header)
+                        await add_messages_to_delete(msg_data=msg_data, messages=[header_msg])
+                        header_sent = True
+
+                    reports = department_report["reports"]
+                    header = department_report["header"]
+                    await send_one_texts(reports, msg_data, report_type, type_prefix, period, department, only_negative, recommendations, header=header)
+        except ReportNotLoadedError:
+            await loading_msg.edit_text(text="Не удалось загрузить отчёт", reply_markup=back_kb)
+            return
 
     # кнопка назад
     await msg_data.msg.answer(text="Вернуться назад?", reply_markup=back_kb)
@@ -159,14 +195,29 @@ async def parameters_msg(msg_data: MsgData, type_prefix: str = "", only_negative
     await loading_msg.delete()
 
 
+def is_report_loaded(reports: list[dict | None], text_type: str) -> bool:
+    # часть отчётов может не загрузиться (таймаут, ошибка API) - некоторые тексты можно составить и без них
+    if text_type in partial_report_types:
+        return any(report is not None for report in reports)
+    return None not in reports
+
+
 async def send_one_texts(reports: list[dict], msg_data: MsgData, report_type: str, type_prefix: str, period: str, department: str, only_negative: bool, recommendations: bool, header: str = "") -> None:
     text_func = text_functions[type_prefix + report_type]
 
-    text_data = TextData(reports=reports, period=period, department=department, only_negative=only_negative)
-    texts: list[str] = text_func(text_data)
+    # повторный показ того же отчёта с теми же параметрами не составляет тексты заново
+    cache_key = render_cache_key(type_prefix + report_type, reports, period, department, only_negative, recommendations)
+    texts = render_cache.get(cache_key) if cache_key is not None else None
+
+    if texts is None:
+        text_data = TextData(reports=reports, period=period, department=department, only_negative=only_negative)
+        if report_type == "revenue" and recommendations:
+            texts = revenue_analysis_text(text_data, recommendations=True)
+        else:
+            texts = text_func(text_data)
 
-    if report_type == "revenue" and recommendations:
-        texts = revenue_analysis_text(text_data, recommendations=True)
+        if cache_key is not None:
+            render_cache.set(cache_key, texts)
 
     if len(texts) == 1 and ("**" not in texts[0]): # checks if parse mode is markdown (needs rewrite)
         texts[0] = header + "\n\n" + texts[0]
@@ -0,0 +1,50 @@
+from asyncio import get_event_loop
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+from ..api import report_single_flight
+from ..api_resilience import api_circuit_breaker, retry_budget
+from ..cache.report_cache import report_cache
+from ..cache.persistent_cache import persistent_cache
+from ..cache.render_cache import render_cache
+from ..prefetch import report_prefetcher
+from ..prewarm import report_cache_warmer
+from ..auth.tenant import tenant_registry
+from ..db.db import user_tokens_db
+from src.mailing.data.techsupport.techsupport_google_sheets_worker import techsupport_gsworker
+
+router = Router(name=__name__)
+
+
+# состояние работы с API (для администраторов тех-поддержки)
+@router.message(Command("api_status"))
+async def api_status_handler(message: Message) -> None:
+    loop = get_event_loop()
+    admin_user_ids = await loop.run_in_executor(None, techsupport_gsworker.get_admin_user_ids)
+    if message.from_user.id not in admin_user_ids:
+        return
+
+    await message.answer(text=make_api_status_text())
+
+
+def make_api_status_text() -> str:
+    sections = {
+        "API": api_circuit_breaker.stats(),
+        "Повторы запросов": retry_budget.stats(),
+        "Кэш отчётов": report_cache.stats(),
+        "Кэш на диске": persistent_cache.stats(),
+        "Кэш текстов": render_cache.stats(),
+        "Объединение запросов": report_single_flight.stats(),
+        "Загрузка заранее": report_prefetcher.stats(),
+        "Прогрев кэша": report_cache_warmer.stats(),
+        "Организации": tenant_registry.stats(),
+        "Токены": user_tokens_db.stats(),
+    }
+    lines = []
+    for title, stats in sections.items():
+        lines.append(f"<b>{title}:</b>")
+        lines += [f"<code>{key}</code>: {value}" for key, value in stats.items()]
+        lines.append("")
+    return "\n".join(lines)
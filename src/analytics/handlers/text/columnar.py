@@ -0,0 +1,96 @@
+import operator
+from typing import Callable
+
+try:
+    import numpy as np
+except ImportError:  # без numpy те же вычисления выполняются на чистом Python
+    np = None
+
+import config as cf
+from . import ranking
+
+
+class Columns:
+    # строки отчёта ("data") по столбцам: значения поля всех строк собираются один раз.
+    # для больших отчётов (от cf.COLUMNAR_MIN_ROWS строк) столбцы - массивы numpy (float64, None -> nan),
+    # для остальных - списки. помощники ниже одинаково работают с обоими вариантами
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+        self.vectorized = np is not None and len(rows) >= cf.COLUMNAR_MIN_ROWS
+        self._columns: dict[tuple, list | object] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def values(self, key: str, default=None) -> list:
+        # значения как в строках (row.get(key, default))
+        column = self._columns.get((key, default, False))
+        if column is None:
+            column = self._columns[(key, default, False)] = [row.get(key, default) for row in self.rows]
+        return column
+
+    def column(self, key: str, default=None):
+        # столбец для вычислений: массив numpy или список
+        if not self.vectorized:
+            return self.values(key, default)
+        column = self._columns.get((key, default, True))
+        if column is None:
+            column = self._columns[(key, default, True)] = np.array(self.values(key, default), dtype=float)
+        return column
+
+    def derive(self, func: Callable, *keys: str):
+        # новый столбец из нескольких: func применяется к массивам целиком или к значениям каждой строки.
+        # строки, где какого-то значения нет, получают None (в массиве - nan)
+        columns = [self.column(key) for key in keys]
+        if self.vectorized:
+            return func(*columns)
+        return [None if None in values else func(*values) for values in zip(*columns)]
+
+
+def present(columns: Columns, column) -> list[int]:
+    # номера строк, в которых значение есть
+    if columns.vectorized:
+        return np.flatnonzero(~np.isnan(column)).tolist()
+    return [index for index, item in enumerate(column) if item is not None]
+
+
+def fill_missing(columns: Columns, column, value):
+    # столбец, в котором отсутствующие значения заменены на value
+    if columns.vectorized:
+        return np.where(np.isnan(column), value, column)
+    return [value if item is None else item for item in column]
+
+
+def threshold(columns: Columns, column, op: Callable, value) -> list[int]:
+    # номера строк, в которых значение есть и op(значение, value) (op - из operator: lt, le, gt, ge)
+    if columns.vectorized:
+        # сравнения с nan всегда ложны
+        return np.flatnonzero(op(column, value)).tolist()
+    return [index for index, item in enumerate(column) if item is not None and op(item, value)]
+
+
+def partition(columns: Columns, column) -> tuple[list[int], list[int]]:
+    # номера строк с отрицательным и с неотрицательным значением (строки без значения не входят)
+    return threshold(columns, column, operator.lt, 0), threshold(columns, column, operator.ge, 0)
+
+
+def percent_change(current, previous):
+    # изменение в процентах ((стало - было) / было * 100), если было 0 - 0.
+    # для чисел, списков и массивов numpy (поэлементно)
+    if np is not None and isinstance(previous, np.ndarray):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(previous != 0, ((current - previous) / previous) * 100, 0)
+    if isinstance(previous, list):
+        return [percent_change(current_item, previous_item) for current_item, previous_item in zip(current, previous)]
+    return ((current - previous) / previous) * 100 if previous != 0 else 0
+
+
+def top_k(columns: Columns, column, indices: list[int], k: int, reverse: bool = False) -> list[int]:
+    # k строк из indices с наименьшими (reverse - наибольшими) значениями;
+    # при равных значениях сохраняется порядок строк, как у sorted()
+    if columns.vectorized:
+        indices = np.asarray(indices, dtype=int)
+        keys = column[indices]
+        order = np.argsort(-keys if reverse else keys, kind="stable")[:k]
+        return indices[order].tolist()
+    return ranking.top_k(indices, k, key=column.__getitem__, reverse=reverse)
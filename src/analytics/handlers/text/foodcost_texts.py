@@ -1,4 +1,8 @@
+import operator
+
 from ..types.text_data import TextData
+from .text_util import missing_data_text
+from .columnar import Columns, threshold, top_k
 
 
 period_mapping = {
@@ -37,7 +41,10 @@ def foodcost_text(text_data: TextData) -> list[str]:
 
 
 def foodcost_analysis_text(text_data: TextData) -> list[str]:
-    report = foodcost_text(text_data)[0]
+    if text_data.reports[0] is not None:
+        report = foodcost_text(text_data)[0]
+    else:
+        report = missing_data_text
     
     dish_data = text_data.reports[1]
     
@@ -45,30 +52,34 @@ def foodcost_analysis_text(text_data: TextData) -> list[str]:
     
     report += "\n"
 
+    if dish_data is None:
+        report += "\nТОП 5 позиций по изменению фудкоста:\n" + missing_data_text
+        return [report]
+
+    dishes = dish_data["data"]
+    columns = Columns(dishes)
+    dynamics = columns.column(period_key)
+
     if not text_data.only_negative:
         report += "\n📉 ТОП 5 позиций по снижению фудкоста:\n"
-        decreasing = [
-            (item["label"], item["food_cost"], item["food_cost"] + item[period_key])
-            for item in dish_data["data"] if item.get(period_key) is not None and item[period_key] <= 0
-        ]
-        decreasing.sort(key=lambda x: x[1] - x[2])
+        decreasing = threshold(columns, dynamics, operator.le, 0)
+        decrease = columns.derive(lambda food_cost, dynamic: food_cost - (food_cost + dynamic), "food_cost", period_key)
         cnt = 1
-        for name, old, new in decreasing[:5]:
-            report += f"{cnt}. {name}: {old:,.1f}% → {new:,.1f}%\n"
+        for index in top_k(columns, decrease, decreasing, 5):
+            item = dishes[index]
+            report += f"{cnt}. {item['label']}: {item['food_cost']:,.1f}% → {item['food_cost'] + item[period_key]:,.1f}%\n"
             cnt += 1
 
         if not decreasing:
             report += "Нет данных по снижению фудкоста.\n"
 
     report += "\n📈 ТОП 5 позиций по росту фудкоста:\n"
-    increasing = [
-        (item["label"], item["food_cost"], item["food_cost"] + item[period_key])
-        for item in dish_data["data"] if item.get(period_key) is not None and item[period_key] > 0
-    ]
-    increasing.sort(key=lambda x: x[2] - x[1], reverse=True)
+    increasing = threshold(columns, dynamics, operator.gt, 0)
+    increase = columns.derive(lambda food_cost, dynamic: (food_cost + dynamic) - food_cost, "food_cost", period_key)
     cnt = 1
-    for name, old, new in increasing[:5]:
-        report += f"{cnt}. {name}: {old:,.1f}% → {new:,.1f}%\n"
+    for index in top_k(columns, increase, increasing, 5, reverse=True):
+        item = dishes[index]
+        report += f"{cnt}. {item['label']}: {item['food_cost']:,.1f}% → {item['food_cost'] + item[period_key]:,.1f}%\n"
         cnt += 1
 
     if not increasing:
@@ -1,4 +1,5 @@
 from ..types.text_data import TextData
+from .ranking import TopK
 
 
 def forecast_text(text_data: TextData) -> list[str]:
@@ -16,8 +17,9 @@ def forecast_text(text_data: TextData) -> list[str]:
 
     old_price_key, new_price_key, loss_key = period_mapping[period]
 
-    increasing_prices = []
-    decreasing_prices = []
+    # в каждом списке хранится только ТОП 10 по прогнозу потерь
+    increasing_prices = TopK(10, reverse=True)
+    decreasing_prices = TopK(10, reverse=True)
 
     for item in data["data"]:
         old_price = item.get(old_price_key)
@@ -26,21 +28,18 @@ def forecast_text(text_data: TextData) -> list[str]:
 
         if old_price is not None and new_price is not None:
             if new_price > old_price:
-                increasing_prices.append((item["label"], old_price, new_price, forecast_loss))
+                increasing_prices.push(forecast_loss, (item["label"], old_price, new_price, forecast_loss))
             elif new_price < old_price:
-                decreasing_prices.append((item["label"], old_price, new_price, forecast_loss))
-
-    increasing_prices.sort(key=lambda x: x[3], reverse=True)
-    decreasing_prices.sort(key=lambda x: x[3], reverse=True)
+                decreasing_prices.push(forecast_loss, (item["label"], old_price, new_price, forecast_loss))
 
     total_loss = data["sum"].get("forecast", 0)
 
     price_increase_texts = []
-    for name, old, new, loss in increasing_prices[:10]:
+    for name, old, new, loss in increasing_prices.result():
         price_increase_texts.append(f"{len(price_increase_texts) + 1}. {name} {old} руб / {new} руб / {loss} руб")
 
     price_decrease_texts = []
-    for name, old, new, loss in decreasing_prices[:10]:
+    for name, old, new, loss in decreasing_prices.result():
         price_decrease_texts.append(f"{len(price_decrease_texts) + 1}. {name} {old} руб / {new} руб / {loss} руб")
 
     report = f"""
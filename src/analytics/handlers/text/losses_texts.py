@@ -1,3 +1,6 @@
+from .ranking import TopK
+
+
 def losses_text(data: list, period: str, only_negative: bool) -> list[str]:
     data = data[0]
     report = "<b>Рост закупочных цен:</b>\n"
@@ -11,12 +14,19 @@ def losses_text(data: list, period: str, only_negative: bool) -> list[str]:
 
     price_key_current, price_key_previous, loss_key = period_mapping.get(period, period_mapping["last-week"])
 
-    price_increase = sorted(
-        [item for item in data["data"] if
-         item[price_key_current] and item[price_key_previous] and item[price_key_current] > item[price_key_previous]],
-        key=lambda x: x[loss_key],
-        reverse=True
-    )[:10]
+    # рост и снижение цен - за один проход, в каждом хранится только ТОП 10 по потерям
+    increase = TopK(10, reverse=True)
+    decrease = TopK(10)
+    for item in data["data"]:
+        current = item[price_key_current]
+        previous = item[price_key_previous]
+        if current and previous:
+            if current > previous:
+                increase.push(item[loss_key], item)
+            elif current < previous and not only_negative:
+                decrease.push(item[loss_key], item)
+
+    price_increase = increase.result()
 
     for i in range(len(price_increase)):
         item = price_increase[i]
@@ -26,11 +36,7 @@ def losses_text(data: list, period: str, only_negative: bool) -> list[str]:
         report += "\n<b>Снижение закупочных цен:</b>\n"
         report += "<b><i>цена старая / цена новая / факт потерь за период</i></b>\n\nТОП 10:\n"
 
-        price_decrease = sorted(
-            [item for item in data["data"] if
-            item[price_key_current] and item[price_key_previous] and item[price_key_current] < item[price_key_previous]],
-            key=lambda x: x[loss_key]
-        )[:10]
+        price_decrease = decrease.result()
 
         for i in range(len(price_decrease)):
             item = price_decrease[i]
@@ -1,4 +1,5 @@
 from ..types.text_data import TextData
+from .columnar import Columns, fill_missing, partition, top_k
 
 
 PERIOD_TRANSLATION = {
@@ -58,22 +59,13 @@ def generate_markup_store_report(data, period="month", only_negative=False):
     # Ключ для динамики
     dynamics_key = f"markup_dynamics_{period}"
 
-    # Разделение на положительные и отрицательные изменения
-    positive_changes = []
-    negative_changes = []
-
-    for item in data["data"]:
-        label = item["label"]
-        markup = item["markup"]
-        dynamics = item.get(dynamics_key, 0)  # Получаем динамику по ключу
-
-        if dynamics is None:
-            continue
+    # Разделение на положительные и отрицательные изменения (строки без динамики пропускаются)
+    rows = data["data"]
+    columns = Columns(rows)
+    negative, positive = partition(columns, columns.column(dynamics_key, 0))
 
-        if dynamics < 0:
-            negative_changes.append(f"<b>{label}</b>:  {markup:,.1f}%")
-        else:
-            positive_changes.append(f"<b>{label}</b>:  {markup:,.1f}%")
+    negative_changes = [f"<b>{rows[index]['label']}</b>:  {rows[index]['markup']:,.1f}%" for index in negative]
+    positive_changes = [f"<b>{rows[index]['label']}</b>:  {rows[index]['markup']:,.1f}%" for index in positive]
 
     # Вывод отрицательных изменений
     if negative_changes:
@@ -95,15 +87,18 @@ def generate_markup_dish_report(data, period="month", only_negative=False):
     # Ключ для динамики
     dynamics_key = f"markup_dynamics_{period}"
 
-    # Сортировка данных по динамике наценки
+    # 5 позиций с наименьшей динамикой наценки
     # Заменяем None на 0 для корректной сортировки
-    sorted_data = sorted(data["data"], key=lambda x: x.get(dynamics_key, 0) or 0)
+    rows = data["data"]
+    columns = Columns(rows)
+    dynamics = fill_missing(columns, columns.column(dynamics_key, 0), 0)
 
     # Разделение на положительные и отрицательные изменения
     positive_changes = []
     negative_changes = []
 
-    for item in sorted_data[:5]:
+    for index in top_k(columns, dynamics, range(len(rows)), 5):
+        item = rows[index]
         label = item["label"]
         markup = item["markup"]
         dynamics = item.get(dynamics_key, 0)  # Получаем динамику по ключу
@@ -0,0 +1,34 @@
+import heapq
+from typing import Any, Callable, Iterable
+
+
+class TopK:
+    # k лучших элементов за один проход без сортировки всего списка: с наименьшими ключами (reverse - с наибольшими).
+    # результат совпадает с sorted(items, key=key, reverse=reverse)[:k]: при равных ключах - добавленные раньше.
+    # ключи - числа
+    def __init__(self, k: int, reverse: bool = False) -> None:
+        self.k = k
+        self.sign = 1 if reverse else -1
+        # в корне кучи - худший из отобранных: (ключ со знаком, -номер добавления, элемент)
+        self._heap: list[tuple[float, int, Any]] = []
+        self._count = 0
+
+    def push(self, key: float, item: Any) -> None:
+        signed_key = self.sign * key
+        self._count += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, (signed_key, -self._count, item))
+        elif self.k and signed_key > self._heap[0][0]:
+            # при равном ключе элемент, добавленный позже, хуже - не заменяем
+            heapq.heapreplace(self._heap, (signed_key, -self._count, item))
+
+    def result(self) -> list:
+        # номера добавления различны, поэтому сами элементы не сравниваются
+        return [item for _, _, item in sorted(self._heap, reverse=True)]
+
+
+def top_k(items: Iterable, k: int, key: Callable[[Any], float], reverse: bool = False) -> list:
+    top = TopK(k, reverse)
+    for item in items:
+        top.push(key(item), item)
+    return top.result()
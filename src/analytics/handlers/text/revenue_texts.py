@@ -1,5 +1,9 @@
+import operator
+
 from ..types.text_data import TextData
 from ..types.report_all_departments_types import ReportAllDepartmentTypes
+from .text_util import missing_data_text
+from .columnar import Columns, percent_change, threshold, top_k
 
 
 revenue_recommendations = {
@@ -80,23 +84,27 @@ revenue_recommendations = {
 
 def load_data_from_files(text_data: TextData):
     reports = text_data.reports
+
+    # незагруженные отчёты (None) остаются None, такие разделы помечаются в тексте
+    def part(report: dict | None, key: str):
+        return report[key] if report is not None else None
     
     # Загружаем данные из файлов
-    guests_checks = reports[0]['sum']
+    guests_checks = part(reports[0], 'sum')
 
-    avg_check = reports[1]['sum']
+    avg_check = part(reports[1], 'sum')
 
-    revenue_store = reports[3]['data']  # Используем данные из массива, а не сумму
+    revenue_store = part(reports[3], 'data')  # Используем данные из массива, а не сумму
 
-    revenue_dish = reports[4]['data']  # Используем данные из массива, а не сумму
+    revenue_dish = part(reports[4], 'data')  # Используем данные из массива, а не сумму
 
-    revenue_time = reports[5]['data']
+    revenue_time = part(reports[5], 'data')
 
-    revenue_date_of_week = reports[7]['data']
+    revenue_date_of_week = part(reports[7], 'data')
 
     revenue_waiter = reports[8]
 
-    revenue_price_segments = reports[6]['data']
+    revenue_price_segments = part(reports[6], 'data')
 
     # Формируем общий словарь с данными
     data = {
@@ -108,467 +116,309 @@ def load_data_from_files(text_data: TextData):
         'revenue-date_of_week': revenue_date_of_week,
         'revenue-waiter': revenue_waiter,
         'revenue-price_segments': revenue_price_segments,
-        "check-depth": reports[9]['sum']
+        "check-depth": part(reports[9], 'sum')
     }
 
     return data
 
 
-def analyze_revenue(data, period="week", only_negative: bool = False, recommendations: bool = False):
-    # Определяем ключи для выбранного периода
-    period_keys = {
-        "week": {
-            "revenue_key": "week",
-            "dynamics_key": "dynamics_week",
-            "dynamic_key": "dynamic_week",
-            "label": "неделю"
-        },
-        "month": {
-            "revenue_key": "month",
-            "dynamics_key": "dynamics_month",
-            "dynamic_key": "dynamic_month",
-            "label": "месяц"
-        },
-        "year": {
-            "revenue_key": "year",
-            "dynamics_key": "dynamics_year",
-            "dynamic_key": "dynamic_year",
-            "label": "год"
-        }
+# ключи показателей для периода сравнения
+period_keys = {
+    "week": {
+        "revenue_key": "week",
+        "dynamics_key": "dynamics_week",
+        "dynamic_key": "dynamic_week",
+        "label": "неделю"
+    },
+    "month": {
+        "revenue_key": "month",
+        "dynamics_key": "dynamics_month",
+        "dynamic_key": "dynamic_month",
+        "label": "месяц"
+    },
+    "year": {
+        "revenue_key": "year",
+        "dynamics_key": "dynamics_year",
+        "dynamic_key": "dynamic_year",
+        "label": "год"
     }
+}
 
-    if period not in period_keys:
-        raise ValueError("Неподдерживаемый период. Используйте 'week', 'month' или 'year'.")
+# категории блюд в порядке вывода
+dish_categories = ["Салаты", "Супы", "Выпечка", "Кофе", "Другие"]
+
+days_of_week = {
+    "Понедельник": "Пн",
+    "Вторник": "Вт",
+    "Среда": "Ср",
+    "Четверг": "Чт",
+    "Пятница": "Пт",
+    "Суббота": "Сб",
+    "Воскресенье": "Вс"
+}
 
-    revenue_key = period_keys[period]["revenue_key"]
-    dynamics_key = period_keys[period]["dynamics_key"]
-    dynamic_key = period_keys[period]["dynamic_key"]
-    period_label = period_keys[period]["label"]
 
-    # Заголовок отчёта с указанием периода
-    message = (
-        ""
-    )
+# строка показателя: (название, динамика, было, стало)
+Row = tuple[str, float, float, float]
 
-    # 1. Гостевой поток и средний чек
-    guests_checks = data['guests-checks']
-    avg_check = data['avg-check']
-    check_depth = data['check-depth']
-    message += (
-        "<b> 1 Гостевой поток:</b>\n"
-    )
 
-    # Собираем данные по динамике
-    metrics = [
-        {
-            "label": "гостепоток",
-            "value": guests_checks.get(f'guests_{dynamics_key}', 0),
-            "current": guests_checks.get('guests', 0),
-            "previous": guests_checks.get(f'guests_{revenue_key}', 0)
-        },
-    ]
-
-    # Разделяем на отрицательные и положительные изменения
-    negative_changes = [m for m in metrics if m['value'] < 0]
-    positive_changes = [m for m in metrics if m['value'] >= 0]
+def add_dynamics(out: list[str], rows: list[Row], only_negative: bool, signs: tuple[str, str] = ("- ", "+ ")) -> bool:
+    # сначала отрицательная динамика, затем положительная; возвращает, есть ли отрицательная
+    negative_rows = []
+    positive_rows = []
+    for row in rows:
+        if row[1] < 0:
+            negative_rows.append(row)
+        else:
+            positive_rows.append(row)
 
     # Вывести "всё в ворядке" если нет отрицательных динамик
-    if only_negative and not negative_changes:
-        message += "Всё в порядке 👍\n"
-    message += "\n"
-
-    # Сначала выводим отрицательные изменения
-    if negative_changes:
-        message += "<i>Отрицательная динамика:</i>\n"
-        for metric in negative_changes:
-            message += (
-                f"- {metric['label']}: {metric['value']:.1f}%, "
-                f"{metric['previous']:,.0f} → {metric['current']:,.0f}\n"
-            )
-        message += "\n"
-
-    # Затем выводим положительные изменения
-    if positive_changes and not only_negative:
-        message += "<i>Положительная динамика:</i>\n"
-        for metric in positive_changes:
-            message += (
-                f"+ {metric['label']}: {metric['value']:.1f}%, "
-                f"{metric['previous']:,.0f} → {metric['current']:,.0f}\n"
-            )
-        message += "\n"
-
-    # Выводим рекомендации если есть
-    if recommendations and negative_changes:
-        message += revenue_recommendations["guests"] + "\n"
+    if only_negative and not negative_rows:
+        out.append("Всё в порядке 👍\n")
+    out.append("\n")
 
-    # средний чек
-    message += (
-        "<b> Cредний чек:</b>\n"
-    )
+    if negative_rows:
+        out.append("<i>Отрицательная динамика:</i>\n")
+        for label, dynamics, previous, current in negative_rows:
+            out.append(f"{signs[0]}{label}: {dynamics:.1f}%, {previous:,.0f} → {current:,.0f}\n")
+        out.append("\n")
 
-    # Собираем данные по динамике
-    metrics = [
-        {
-            "label": "средний чек",
-            "value": avg_check.get(f'avg_check_{dynamics_key}', 0),
-            "current": avg_check.get('avg_check', 0),
-            "previous": avg_check.get(f'avg_check_{revenue_key}', 0)
-        },
-        {
-            "label": "глубина чека",
-            "value": check_depth.get(f'depth_{dynamic_key}', 0),
-            "current": check_depth.get('depth', 0),
-            "previous": check_depth.get(f'depth_{revenue_key}', 0)
-        },
-        {
-            "label": "количество чеков",
-            "value": guests_checks.get(f'checks_{dynamics_key}', 0),
-            "current": guests_checks.get('checks', 0),
-            "previous": guests_checks.get(f'checks_{revenue_key}', 0)
-        }
+    if positive_rows and not only_negative:
+        out.append("<i>Положительная динамика:</i>\n")
+        for label, dynamics, previous, current in positive_rows:
+            out.append(f"{signs[1]}{label}: {dynamics:.1f}%, {previous:,.0f} → {current:,.0f}\n")
+        out.append("\n")
+
+    return bool(negative_rows)
+
+
+def add_recommendation(out: list[str], name: str, recommendations: bool, needed: bool) -> None:
+    if recommendations and needed:
+        out.append(revenue_recommendations[name] + "\n")
+
+
+def guests_section(out: list[str], guests_checks: dict | None, keys: dict, only_negative: bool, recommendations: bool) -> None:
+    # 1. Гостевой поток
+    out.append("<b> 1 Гостевой поток:</b>\n")
+    if guests_checks is None:
+        out.append(missing_data_text + "\n")
+        return
+
+    rows = [
+        ("гостепоток", guests_checks.get(f'guests_{keys["dynamics_key"]}', 0), guests_checks.get(f'guests_{keys["revenue_key"]}', 0), guests_checks.get('guests', 0)),
     ]
+    has_negative = add_dynamics(out, rows, only_negative)
+    add_recommendation(out, "guests", recommendations, has_negative)
 
-    # Разделяем на отрицательные и положительные изменения
-    negative_changes = [m for m in metrics if m['value'] < 0]
-    positive_changes = [m for m in metrics if m['value'] >= 0]
 
-    # Вывести "всё в ворядке" если нет отрицательных динамик
-    if only_negative and not negative_changes:
-        message += "Всё в порядке 👍\n"
-    message += "\n"
-
-    # Сначала выводим отрицательные изменения
-    if negative_changes:
-        message += "<i>Отрицательная динамика:</i>\n"
-        for metric in negative_changes:
-            message += (
-                f"- {metric['label']}: {metric['value']:.1f}%, "
-                f"{metric['previous']:,.0f} → {metric['current']:,.0f}\n"
-            )
-        message += "\n"
-
-    # Затем выводим положительные изменения
-    if positive_changes and not only_negative:
-        message += "<i>Положительная динамика:</i>\n"
-        for metric in positive_changes:
-            message += (
-                f"+ {metric['label']}: {metric['value']:.1f}%, "
-                f"{metric['previous']:,.0f} → {metric['current']:,.0f}\n"
-            )
-        message += "\n"
-
-    # Выводим рекомендации если есть
-    if recommendations and negative_changes:
-        message += revenue_recommendations["checks"] + "\n"
-
-    # 2. Выручка по направлениям (бар и кухня)
-    revenue_store = data['revenue-store']
-
-    # Суммируем выручку всех баров и всех кухонь за текущий и предыдущий периоды
-    total_bar_revenue_current = sum(item['revenue'] for item in revenue_store if "Бар" in item['label'])
-    total_bar_revenue_previous = sum(item[f'revenue_{revenue_key}'] for item in revenue_store if "Бар" in item['label'])
-
-    total_kitchen_revenue_current = sum(item['revenue'] for item in revenue_store if "Кухня" in item['label'])
-    total_kitchen_revenue_previous = sum(item[f'revenue_{revenue_key}'] for item in revenue_store if "Кухня" in item['label'])
-
-    # Рассчитываем динамику изменения выручки (в процентах)
-    bar_dynamics = ((
-                            total_bar_revenue_current - total_bar_revenue_previous) / total_bar_revenue_previous) * 100 if total_bar_revenue_previous != 0 else 0
-    kitchen_dynamics = ((
-                                total_kitchen_revenue_current - total_kitchen_revenue_previous) / total_kitchen_revenue_previous) * 100 if total_kitchen_revenue_previous != 0 else 0
-
-    # Формируем сообщение
-    message += "<b>2 Выручка по направлениям:</b>\n"
-
-    store_has_negative = bar_dynamics != abs(bar_dynamics) or kitchen_dynamics != abs(kitchen_dynamics)
+def avg_check_section(out: list[str], avg_check: dict | None, check_depth: dict | None, guests_checks: dict | None, keys: dict, only_negative: bool, recommendations: bool) -> None:
+    # средний чек
+    out.append("<b> Cредний чек:</b>\n")
+    if avg_check is None or check_depth is None or guests_checks is None:
+        out.append(missing_data_text + "\n")
+        return
+
+    revenue_key = keys["revenue_key"]
+    dynamics_key = keys["dynamics_key"]
+    rows = [
+        ("средний чек", avg_check.get(f'avg_check_{dynamics_key}', 0), avg_check.get(f'avg_check_{revenue_key}', 0), avg_check.get('avg_check', 0)),
+        ("глубина чека", check_depth.get(f'depth_{keys["dynamic_key"]}', 0), check_depth.get(f'depth_{revenue_key}', 0), check_depth.get('depth', 0)),
+        ("количество чеков", guests_checks.get(f'checks_{dynamics_key}', 0), guests_checks.get(f'checks_{revenue_key}', 0), guests_checks.get('checks', 0)),
+    ]
+    has_negative = add_dynamics(out, rows, only_negative)
+    add_recommendation(out, "checks", recommendations, has_negative)
+
+
+def store_section(out: list[str], revenue_store: list[dict] | None, keys: dict, only_negative: bool) -> bool:
+    # 2. Выручка по направлениям (бар и кухня); возвращает, есть ли отрицательная динамика
+    out.append("<b>2 Выручка по направлениям:</b>\n")
+    if revenue_store is None:
+        out.append(missing_data_text + "\n")
+        return False
+
+    # выручка всех баров и всех кухонь за текущий и предыдущий периоды - за один проход
+    previous_key = f'revenue_{keys["revenue_key"]}'
+    bar_current = bar_previous = kitchen_current = kitchen_previous = 0
+    for item in revenue_store:
+        label = item['label']
+        if "Бар" in label:
+            bar_current += item['revenue']
+            bar_previous += item[previous_key]
+        if "Кухня" in label:
+            kitchen_current += item['revenue']
+            kitchen_previous += item[previous_key]
+
+    bar_dynamics = percent_change(bar_current, bar_previous)
+    kitchen_dynamics = percent_change(kitchen_current, kitchen_previous)
+
+    bar_negative = bar_dynamics != abs(bar_dynamics)
+    kitchen_negative = kitchen_dynamics != abs(kitchen_dynamics)
+    has_negative = bar_negative or kitchen_negative
 
     # Вывести "всё в ворядке" если нет отрицательных динамик
-    if only_negative and not store_has_negative:
-        message += "Всё в порядке 👍\n"
-    message += "\n"
-    
-    # проверка
-    if bar_dynamics != abs(bar_dynamics) or not only_negative:
-        message += f"{'+' if bar_dynamics == abs(bar_dynamics) else '-'} бар: {bar_dynamics:.1f}%, {total_bar_revenue_previous:,.0f} → {total_bar_revenue_current:,.0f}\n"
-        
-    if kitchen_dynamics != abs(kitchen_dynamics) or not only_negative:
-        message += f"{'+' if kitchen_dynamics == abs(kitchen_dynamics) else '-'} кухня: {kitchen_dynamics:.1f}%, {total_kitchen_revenue_previous:,.0f} → {total_kitchen_revenue_current:,.0f}\n\n"
+    if only_negative and not has_negative:
+        out.append("Всё в порядке 👍\n")
+    out.append("\n")
 
-    # 3. Выручка по группам блюд
-    revenue_dish = data['revenue-dish']
-    if revenue_dish:
-        message += "<b>3 Выручка по группам блюд:</b>\n"
-
-        # Словарь для категорий блюд
-        dish_categories = {
-            "Салаты": [],
-            "Супы": [],
-            "Выпечка": [],
-            "Кофе": [],
-            "Другие": []  # Для всех остальных блюд
-        }
+    if bar_negative or not only_negative:
+        out.append(f"{'-' if bar_negative else '+'} бар: {bar_dynamics:.1f}%, {bar_previous:,.0f} → {bar_current:,.0f}\n")
+    if kitchen_negative or not only_negative:
+        out.append(f"{'-' if kitchen_negative else '+'} кухня: {kitchen_dynamics:.1f}%, {kitchen_previous:,.0f} → {kitchen_current:,.0f}\n\n")
 
-        # Группируем блюда по категориям
-        for dish in revenue_dish:
-            label = dish['label'].lower()
-            if "салат" in label:
-                dish_categories["Салаты"].append(dish)
-            elif "суп" in label:
-                dish_categories["Супы"].append(dish)
-            elif "выпечка" in label or "пирог" in label or "торт" in label:
-                dish_categories["Выпечка"].append(dish)
-            elif "кофе" in label or "капучино" in label or "латте" in label:
-                dish_categories["Кофе"].append(dish)
-            else:
-                dish_categories["Другие"].append(dish)
-
-        # Собираем данные по категориям
-        category_data = []
-        for category, dishes in dish_categories.items():
-            if dishes:
-                total_revenue_previous = sum(dish.get(f'revenue_{revenue_key}', 0) for dish in dishes)
-                total_revenue_current = sum(dish.get('revenue', 0) for dish in dishes)
-                total_dynamics = ((
-                                              total_revenue_current - total_revenue_previous) / total_revenue_previous) * 100 if total_revenue_previous != 0 else 0
-
-                category_data.append({
-                    "category": category,
-                    "dynamics": total_dynamics,
-                    "revenue_previous": total_revenue_previous,
-                    "revenue_current": total_revenue_current
-                })
-
-
-        # Сортируем категории по динамике (сначала отрицательные, затем положительные)
-        negative_changes = [item for item in category_data if item['dynamics'] < 0]
-        positive_changes = [item for item in category_data if item['dynamics'] >= 0]
-
-        # Вывести "всё в ворядке" если нет отрицательных динамик
-        if only_negative and not negative_changes:
-            message += "Всё в порядке 👍\n"
-        message += "\n"
-
-        # Сначала выводим отрицательные изменения
-        if negative_changes:
-            message += "<i>Отрицательная динамика:</i>\n"
-            for item in negative_changes:
-                message += (
-                    f"{item['category']}: {item['dynamics']:.1f}%, "
-                    f"{item['revenue_previous']:,.0f} → {item['revenue_current']:,.0f}\n"
-                )
-            message += "\n"
-
-        # Затем выводим положительные изменения
-        if positive_changes and not only_negative:
-            message += "<i>Положительная динамика:</i>\n"
-            for item in positive_changes:
-                message += (
-                    f"{item['category']}: {item['dynamics']:.1f}%, "
-                    f"{item['revenue_previous']:,.0f} → {item['revenue_current']:,.0f}\n"
-                )
-            message += "\n"
-
-        # Выводим рекомендации если есть
-        if recommendations and (negative_changes or store_has_negative):
-            message += revenue_recommendations["dish"] + "\n"
+    return has_negative
 
-    # 4. Выручка по времени посещения
-    revenue_time = data['revenue-time']
-    message += "<b>4 Выручка по времени посещения:</b>\n"
 
-    # Сортируем данные по динамике (сначала отрицательные, затем положительные)
-    negative_changes = []
-    positive_changes = []
+def dish_section(out: list[str], revenue_dish: list[dict] | None, keys: dict, only_negative: bool, recommendations: bool, store_has_negative: bool) -> None:
+    # 3. Выручка по группам блюд
+    if revenue_dish is None:
+        out.append("<b>3 Выручка по группам блюд:</b>\n" + missing_data_text + "\n")
+        return
+    if not revenue_dish:
+        return
+    out.append("<b>3 Выручка по группам блюд:</b>\n")
+
+    # блюда делятся по категориям за один проход
+    groups: dict[str, list[dict]] = {category: [] for category in dish_categories}
+    for dish in revenue_dish:
+        label = dish['label'].lower()
+        if "салат" in label:
+            groups["Салаты"].append(dish)
+        elif "суп" in label:
+            groups["Супы"].append(dish)
+        elif "выпечка" in label or "пирог" in label or "торт" in label:
+            groups["Выпечка"].append(dish)
+        elif "кофе" in label or "капучино" in label or "латте" in label:
+            groups["Кофе"].append(dish)
+        else:
+            groups["Другие"].append(dish)
 
-    for time_slot in revenue_time:
-        label = time_slot['label']
-        dynamics = time_slot.get(f'revenue_{dynamics_key}', 0) or 0  # Используем 0, если динамика отсутствует
-        revenue_previous = time_slot.get(f'revenue_{revenue_key}', 0)
-        revenue_current = time_slot.get('revenue', 0)
+    previous_key = f'revenue_{keys["revenue_key"]}'
+    rows = []
+    for category, dishes in groups.items():
+        if dishes:
+            previous = sum(dish.get(previous_key, 0) for dish in dishes)
+            current = sum(dish.get('revenue', 0) for dish in dishes)
+            rows.append((category, percent_change(current, previous), previous, current))
+    has_negative = add_dynamics(out, rows, only_negative, signs=("", ""))
+    add_recommendation(out, "dish", recommendations, has_negative or store_has_negative)
 
-        if dynamics < 0:
-            negative_changes.append((label, dynamics, revenue_previous, revenue_current))
-        else:
-            positive_changes.append((label, dynamics, revenue_previous, revenue_current))
 
-    # Вывести "всё в ворядке" если нет отрицательных динамик
-    if only_negative and not negative_changes:
-        message += "Всё в порядке 👍\n"
-    message += "\n"
-
-    # Сначала выводим отрицательные изменения
-    if negative_changes:
-        message += "<i>Отрицательная динамика:</i>\n"
-        for label, dynamics, revenue_previous, revenue_current in negative_changes:
-            message += f"{label}: {dynamics:.1f}%, {revenue_previous:,.0f} → {revenue_current:,.0f}\n"
-        message += "\n"
-
-    # Затем выводим положительные изменения
-    if positive_changes and not only_negative:
-        message += "<i>Положительная динамика:</i>\n"
-        for label, dynamics, revenue_previous, revenue_current in positive_changes:
-            message += f"{label}: {dynamics:.1f}%, {revenue_previous:,.0f} → {revenue_current:,.0f}\n"
-        message += "\n"
-
-    # Выводим рекомендации если есть
-    if recommendations and negative_changes:
-        message += revenue_recommendations["time"] + "\n"
+def time_section(out: list[str], revenue_time: list[dict] | None, keys: dict, only_negative: bool, recommendations: bool) -> None:
+    # 4. Выручка по времени посещения
+    out.append("<b>4 Выручка по времени посещения:</b>\n")
+    if revenue_time is None:
+        out.append(missing_data_text + "\n")
+        return
+
+    rows = [
+        # 0, если динамика отсутствует
+        (time_slot['label'], time_slot.get(f'revenue_{keys["dynamics_key"]}', 0) or 0, time_slot.get(f'revenue_{keys["revenue_key"]}', 0), time_slot.get('revenue', 0))
+        for time_slot in revenue_time
+    ]
+    has_negative = add_dynamics(out, rows, only_negative, signs=("", ""))
+    add_recommendation(out, "time", recommendations, has_negative)
 
-    # 5. Выручка по ценовым сегментам
-    revenue_price_segments = data.get('revenue-price_segments', [])
-    message += "<b>5 Выручка по ценовым сегментам:</b>\n"
-
-    if revenue_price_segments:
-        negative_changes = []
-        positive_changes = []
-
-
-        for segment in revenue_price_segments:
-            label = segment.get('label', '')
-            dynamics = segment.get(f'revenue_{dynamics_key}', 0) or 0
-            revenue_previous = segment.get(f'revenue_{revenue_key}', 0)
-            revenue_current = segment.get('revenue', 0)
-
-            if dynamics < 0:
-                negative_changes.append((label, dynamics, revenue_previous, revenue_current))
-            else:
-                positive_changes.append((label, dynamics, revenue_previous, revenue_current))
-
-        # Вывести "всё в ворядке" если нет отрицательных динамик
-        if only_negative and not negative_changes:
-            message += "Всё в порядке 👍\n"
-        message += "\n"
-
-        # Сначала выводим отрицательные изменения
-        if negative_changes:
-            message += "<i>Отрицательная динамика:</i>\n"
-            for label, dynamics, revenue_previous, revenue_current in negative_changes:
-                message += f"- {label}: {dynamics:.1f}%, {revenue_previous:,.0f} → {revenue_current:,.0f}\n"
-            message += "\n"
-
-        # Затем выводим положительные изменения
-        if positive_changes and not only_negative:
-            message += "<i>Положительная динамика:</i>\n"
-            for label, dynamics, revenue_previous, revenue_current in positive_changes:
-                message += f"+ {label}: {dynamics:.1f}%, {revenue_previous:,.0f} → {revenue_current:,.0f}\n"
-            message += "\n"
-
-            # Выводим рекомендации если есть
-        if recommendations and negative_changes:
-            message += revenue_recommendations["price_segments"] + "\n"
 
-    else:
-        message += "Данные по ценовым сегментам отсутствуют.\n\n"
+def price_segments_section(out: list[str], revenue_price_segments: list[dict] | None, keys: dict, only_negative: bool, recommendations: bool) -> None:
+    # 5. Выручка по ценовым сегментам
+    out.append("<b>5 Выручка по ценовым сегментам:</b>\n")
+    if revenue_price_segments is None:
+        out.append(missing_data_text + "\n")
+        return
+    if not revenue_price_segments:
+        out.append("Данные по ценовым сегментам отсутствуют.\n\n")
+        return
+
+    rows = [
+        (segment.get('label', ''), segment.get(f'revenue_{keys["dynamics_key"]}', 0) or 0, segment.get(f'revenue_{keys["revenue_key"]}', 0), segment.get('revenue', 0))
+        for segment in revenue_price_segments
+    ]
+    has_negative = add_dynamics(out, rows, only_negative)
+    add_recommendation(out, "price_segments", recommendations, has_negative)
 
 
+def days_section(out: list[str], revenue_date_of_week: list[dict] | None, keys: dict, only_negative: bool, recommendations: bool) -> None:
     # 6. Выручка по дням недели
-    revenue_date_of_week = data['revenue-date_of_week']
-    message += "<b>6 Выручка по дням недели:</b>\n"
-
-    if isinstance(revenue_date_of_week, list):
-        # Сортируем дни по динамике (сначала отрицательные, затем положительные)
-        days_of_week = {
-            "Понедельник": "Пн",
-            "Вторник": "Вт",
-            "Среда": "Ср",
-            "Четверг": "Чт",
-            "Пятница": "Пт",
-            "Суббота": "Сб",
-            "Воскресенье": "Вс"
-        }
+    out.append("<b>6 Выручка по дням недели:</b>\n")
+    if revenue_date_of_week is None:
+        out.append(missing_data_text + "\n")
+        return
+    if not isinstance(revenue_date_of_week, list):
+        out.append("Данные по дням недели отсутствуют или имеют неверный формат.\n\n")
+        return
+
+    # первая строка для каждого дня - за один проход
+    day_infos = {}
+    for item in revenue_date_of_week:
+        day_infos.setdefault(item.get('label'), item)
+
+    rows = []
+    for full_day, short_day in days_of_week.items():
+        day_info = day_infos.get(full_day)
+        if day_info:
+            rows.append((short_day, day_info.get(f'revenue_{keys["dynamics_key"]}', 0), day_info.get(f'revenue_{keys["revenue_key"]}', 0), day_info.get('revenue', 0)))
+
+    has_negative = add_dynamics(out, rows, only_negative)
+    add_recommendation(out, "day_of_week", recommendations, has_negative)
+
+
+def waiter_lines(waiter: dict) -> str:
+    return (
+        f"| среднедневная выручка {waiter['avg_revenue']:,.0f} руб\n"
+        f"| средний чек {waiter['avg_checks']:,.0f} руб\n"
+        f"| глубина чека {waiter['depth']}\n\n"
+    )
 
-        # Собираем данные по дням
-        day_data = {}
-        for full_day, short_day in days_of_week.items():
-            day_info = next((item for item in revenue_date_of_week if item['label'] == full_day), None)
-            if day_info:
-                day_data[short_day] = {
-                    "dynamics": day_info.get(f'revenue_{dynamics_key}', 0),
-                    "revenue_previous": day_info.get(f'revenue_{revenue_key}', 0),
-                    "revenue_current": day_info.get('revenue', 0)
-                }
-
-        # Разделяем дни на отрицательные и положительные
-        negative_days = {day: data_ for day, data_ in day_data.items() if data_['dynamics'] < 0}
-        positive_days = {day: data_ for day, data_ in day_data.items() if data_['dynamics'] >= 0}
-
-        # Вывести "всё в ворядке" если нет отрицательных динамик
-        if only_negative and not negative_days:
-            message += "Всё в порядке 👍\n"
-        message += "\n"
-
-        # Формируем сообщение
-        if negative_days:
-            message += "<i>Отрицательная динамика:</i>\n"
-            for day, data_ in negative_days.items():
-                message += f"- {day}: {data_['dynamics']:.1f}%, {data_['revenue_previous']:,.0f} → {data_['revenue_current']:,.0f}\n"
-            message += "\n"
-
-        if positive_days and not only_negative:
-            message += "<i>Положительная динамика:</i>\n"
-            for day, data_ in positive_days.items():
-                message += f"+ {day}: {data_['dynamics']:.1f}%, {data_['revenue_previous']:,.0f} → {data_['revenue_current']:,.0f}\n"
-            message += "\n"
-
-        # Выводим рекомендации если есть
-        if recommendations and negative_days:
-            message += revenue_recommendations["day_of_week"] + "\n"
-        
-    else:
-        message += "Данные по дням недели отсутствуют или имеют неверный формат.\n\n"
 
+def waiter_section(out: list[str], revenue_waiter: dict | None, only_negative: bool, recommendations: bool) -> None:
     # 7. Выручка по сотрудникам
+    if revenue_waiter is None:
+        out.append("<b>7 Выручка по сотрудникам:</b>\n\n" + missing_data_text + "\n")
+        return
+    if not revenue_waiter or 'data' not in revenue_waiter:
+        return
+    out.append("<b>7 Выручка по сотрудникам:</b>\n\n")
+
+    waiters = revenue_waiter['data']
+    columns = Columns(waiters)
+    revenue = columns.column('revenue', 0)
+
+    # Потеря выручки (топ-10 сотрудников с наибольшей потерей)
+    out.append("<i>7.1 Потеря выручки по сотрудникам (топ-10):</i>\n")
+    loss_waiters = [waiters[index] for index in top_k(columns, revenue, threshold(columns, revenue, operator.lt, 0), 10)]
+    for waiter in loss_waiters:
+        out.append(f"{waiter['label']} {waiter['revenue']} руб\n" + waiter_lines(waiter))
+    if not loss_waiters:
+        out.append("\t<i>-</i>\n\n")
+
+    # Похвала сотрудникам (топ-10 сотрудников с наибольшей выручкой)
+    if not only_negative:
+        out.append("<i>7.2 Похвалите сотрудников (топ-10):</i>\n")
+        praise_waiters = [waiters[index] for index in top_k(columns, revenue, threshold(columns, revenue, operator.gt, 0), 10, reverse=True)]
+        for waiter in praise_waiters:
+            out.append(f"<b><i>{waiter['label']}</i></b>\n" + waiter_lines(waiter))
+        if not praise_waiters:
+            out.append("\t<i>-</i>\n\n")
+
+    add_recommendation(out, "waiter", recommendations, bool(loss_waiters))
+
 
-    revenue_waiter = data['revenue-waiter']
-    if revenue_waiter and 'data' in revenue_waiter:
-        waiters = revenue_waiter['data']
-        message += "<b>7 Выручка по сотрудникам:</b>\n\n"
-
-        # Потеря выручки (топ-10 сотрудников с наибольшей потерей)
-        message += "<i>7.1 Потеря выручки по сотрудникам (топ-10):</i>\n"
-        # Сортируем сотрудников по убыванию потери выручки
-        loss_waiters = sorted(
-            [waiter for waiter in waiters if waiter.get('revenue', 0) < 0],
-            key=lambda x: x['revenue']
-        )[:10]  # Берём только топ-10
-
-        for waiter in loss_waiters:
-            message += (
-                f"{waiter['label']} {waiter['revenue']} руб\n"
-                f"| среднедневная выручка {waiter['avg_revenue']:,.0f} руб\n"
-                f"| средний чек {waiter['avg_checks']:,.0f} руб\n"
-                f"| глубина чека {waiter['depth']}\n\n"
-            )
-
-        if not loss_waiters:
-            message += "\t<i>-</i>\n\n"
-
-        # Похвала сотрудникам (топ-10 сотрудников с наибольшей выручкой)
-        if not only_negative:
-            message += "<i>7.2 Похвалите сотрудников (топ-10):</i>\n"
-            # Сортируем сотрудников по убыванию выручки
-            praise_waiters = sorted(
-                [waiter for waiter in waiters if waiter.get('revenue', 0) > 0],
-                key=lambda x: x['revenue'],
-                reverse=True
-            )[:10]  # Берём только топ-10
-
-            for waiter in praise_waiters:
-                message += (
-                    f"<b><i>{waiter['label']}</i></b>\n"
-                    f"| среднедневная выручка {waiter['avg_revenue']:,.0f} руб\n"
-                    f"| средний чек {waiter['avg_checks']:,.0f} руб\n"
-                    f"| глубина чека {waiter['depth']}\n\n"
-                )
-
-            if not praise_waiters:
-                message += "\t<i>-</i>\n\n"
-
-        # Выводим рекомендации если есть
-        if recommendations and loss_waiters:
-            message += revenue_recommendations["waiter"] + "\n"
-
-    return message
+def analyze_revenue(data, period="week", only_negative: bool = False, recommendations: bool = False):
+    if period not in period_keys:
+        raise ValueError("Неподдерживаемый период. Используйте 'week', 'month' или 'year'.")
+    keys = period_keys[period]
+
+    # разделы дописывают части текста в общий список, текст собирается один раз в конце
+    out: list[str] = []
+    guests_section(out, data['guests-checks'], keys, only_negative, recommendations)
+    avg_check_section(out, data['avg-check'], data['check-depth'], data['guests-checks'], keys, only_negative, recommendations)
+    store_has_negative = store_section(out, data['revenue-store'], keys, only_negative)
+    dish_section(out, data['revenue-dish'], keys, only_negative, recommendations, store_has_negative)
+    time_section(out, data['revenue-time'], keys, only_negative, recommendations)
+    price_segments_section(out, data.get('revenue-price_segments', []), keys, only_negative, recommendations)
+    days_section(out, data['revenue-date_of_week'], keys, only_negative, recommendations)
+    waiter_section(out, data['revenue-waiter'], only_negative, recommendations)
+    return "".join(out)
     
 
 
@@ -0,0 +1,2 @@
+# отметка для разделов отчёта, данные для которых не удалось загрузить
+missing_data_text = "⚠️ <i>Не удалось загрузить данные</i>\n"
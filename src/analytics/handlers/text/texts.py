@@ -33,6 +33,5 @@ text_functions = {
 }
 
 
-
-
-
+# report:type, тексты которых можно составить по части загруженных отчётов (недостающие разделы помечаются)
+partial_report_types = {"analysis.revenue", "analysis.food-cost", "analysis.turnover"}
@@ -1,4 +1,5 @@
 from ..types.text_data import TextData
+from .text_util import missing_data_text
 
 from pprint import pprint
 
@@ -55,6 +56,14 @@ def product_turnover_text(text_data: TextData) -> list[str]:
 
     turnover_key = period_mapping[period]
 
+    if text_data.reports[0] is not None:
+        report = turnover_text(text_data)[0]
+    else:
+        report = "<b>Оборачиваемость остатков:</b>\n" + missing_data_text
+
+    if data is None:
+        return [report + "\nТОП-10 товаров по сумме остатка на конец периода:\n" + missing_data_text]
+
     report_lines = []
     for item in data["data"]:
         turnover = item.get(turnover_key)
@@ -68,6 +77,6 @@ def product_turnover_text(text_data: TextData) -> list[str]:
         formatted_price = f"{remainder_end:,}".replace(",", " ")
         report_lines.append(f"{len(report_lines) + 1}. {item['label']}: {formatted_price} руб, {turnover} дней")
             
-    report = turnover_text(text_data)[0] + "\nТОП-10 товаров по сумме остатка на конец периода:\n" + "\n".join(report_lines)
+    report += "\nТОП-10 товаров по сумме остатка на конец периода:\n" + "\n".join(report_lines)
 
     return [report]
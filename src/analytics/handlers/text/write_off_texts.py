@@ -1,4 +1,7 @@
+import operator
+
 from ..types.text_data import TextData
+from .columnar import Columns, present, threshold
 
 shortage_limit = 2.0
 surplus_limit = 3.0
@@ -18,16 +21,26 @@ def safe_get(data: dict, key: str, placeholder: str = "<i>нет данных</i
 def inventory_text(text_data: TextData) -> list[str]:
     data = text_data.reports[0]["data"]
 
+    # строки, в которых выводится недостача и избыток: есть данные и (для only_negative) выше нормы
+    columns = Columns(data)
+    shortage_percent = columns.column("shortage_percent")
+    surplus_percent = columns.column("surplus_percent")
+    if text_data.only_negative:
+        shortage_rows = set(threshold(columns, shortage_percent, operator.gt, shortage_limit))
+        surplus_rows = set(threshold(columns, surplus_percent, operator.gt, surplus_limit))
+    else:
+        shortage_rows = set(present(columns, shortage_percent))
+        surplus_rows = set(present(columns, surplus_percent))
+
     texts = []
     for index in range(0, len(data), 3):
         text_group = ""
-        for report in data[index:index + 3]:
+        for row_index in range(index, min(index + 3, len(data))):
+            report = data[row_index]
             text = f"<b>{report['label'].split('.')[-1]}</b>\n"
 
-            add_shortage = (report["shortage_percent"] is not None) and (
-                    not text_data.only_negative or report["shortage_percent"] > shortage_limit)
-            add_surplus = (report["surplus_percent"] is not None) and (
-                    not text_data.only_negative or report["surplus_percent"] > surplus_limit)
+            add_shortage = row_index in shortage_rows
+            add_surplus = row_index in surplus_rows
 
             # Вычисление и добавление данных о недостаче
             if add_shortage:
@@ -0,0 +1,57 @@
+from .api import get_reports
+from .api_util import get_request_data
+from .constant.urls import all_report_urls, department_split_endpoints
+from .department_split import split_reports_by_departments
+from .handlers.types.report_all_departments_types import ReportAllDepartmentTypes
+
+
+# разные форматы одного отчёта запрашивают одни и те же url.group
+# ("food-cost" входит в "analysis.food-cost", "turnover.store" - в оба варианта оборотов).
+# планировщик запрашивает каждый url.group один раз и раскладывает ответы по спискам отчётов текстов
+
+
+def get_report_endpoints(text_type: str) -> list[str]:
+    endpoints = all_report_urls.get(text_type)
+    if endpoints is None:
+        raise RuntimeError(f"No url. Please specify url for \"{text_type}\" report type in urls.py")
+    return endpoints
+
+
+def plan_endpoints(text_types: list[str], known: dict[str, dict | None] | None = None) -> list[str]:
+    # url.group, которые нужно запросить для текстов: без повторов и без уже полученных (known)
+    known = known or {}
+    endpoints = (endpoint for text_type in text_types for endpoint in get_report_endpoints(text_type))
+    return [endpoint for endpoint in dict.fromkeys(endpoints) if endpoint not in known]
+
+
+async def get_endpoint_reports(token: str, endpoints: list[str], department: str, period: str, **kwargs) -> dict[str, dict | None]:
+    # url.group -> ответ API; kwargs передаются в get_reports
+    if not endpoints:
+        return {}
+    request_data_list = [get_request_data(token, endpoint, department, period) for endpoint in endpoints]
+    return dict(zip(endpoints, await get_reports(request_data_list, **kwargs)))
+
+
+async def get_text_reports(token: str, text_types: list[str], department: str, period: str, known: dict[str, dict | None] | None = None, **kwargs) -> dict[str, list[dict | None]]:
+    # отчёты для нескольких текстов за один раз: report:type -> список отчётов в порядке urls.py.
+    # known - уже полученные ответы (url.group -> ответ), они не запрашиваются повторно
+    results = (known or {}) | await get_endpoint_reports(token, plan_endpoints(text_types, known), department, period, **kwargs)
+    return {text_type: [results[endpoint] for endpoint in get_report_endpoints(text_type)] for text_type in text_types}
+
+
+async def get_split_endpoint_reports(token: str, text_type: str, departments: dict[str, str], period: str, **kwargs) -> dict[str, dict[str, dict]] | None:
+    # отчёты по всей сети, которые можно разделить по подразделениям, загружаются один раз.
+    # возвращает подразделение -> (url.group -> часть отчёта); остальные url.group запрашиваются по подразделениям.
+    # None - отчёт по всей сети не загрузился; kwargs передаются в get_reports
+    endpoints = [endpoint for endpoint in get_report_endpoints(text_type) if endpoint in department_split_endpoints]
+    network_reports = await get_endpoint_reports(token, endpoints, ReportAllDepartmentTypes.ALL_DEPARTMENTS_INDIVIDUALLY, period, **kwargs)
+    if None in network_reports.values():
+        return None
+
+    result: dict[str, dict[str, dict]] = {}
+    for endpoint, report in network_reports.items():
+        # url.group, строки которого нельзя однозначно сопоставить подразделениям, запрашивается по подразделениям
+        split_reports = split_reports_by_departments([report], departments) or {}
+        for dep_id, (dep_report,) in split_reports.items():
+            result.setdefault(dep_id, {})[endpoint] = dep_report
+    return result
@@ -0,0 +1,127 @@
+from asyncio import CancelledError, Semaphore, Task, create_task
+from collections import Counter, OrderedDict
+
+from .api import get_reports, get_departments
+from .api_resilience import api_circuit_breaker
+from .api_util import get_requests_datas_from_state_data
+from .constant.urls import all_report_urls, department_split_endpoints
+from .constant.variants import branch_types
+from .db.db import user_tokens_db
+from .handlers.types.report_all_departments_types import ReportAllDepartmentTypes
+from .planner import get_split_endpoint_reports
+
+from src.util.log import logger
+import config as cf
+
+
+# периоды по умолчанию, пока у пользователя нет истории
+default_periods = ["last-week", "this-week", "last-month", "this-month"]
+
+# форматы отчёта (type_prefix)
+type_prefixes = ["", "analysis."]
+
+
+class ReportPrefetcher:
+    # пока пользователь выбирает отчёт, заранее загружает в кэш самые вероятные варианты
+    def __init__(self, concurrency: int, max_reports: int, max_history_users: int) -> None:
+        self.max_reports = max_reports
+        self.max_history_users = max_history_users
+        self.prefetched = 0
+        self._semaphore = Semaphore(concurrency)
+        # tgid -> (type_prefix + report:type, period) -> кол-во открытий; давно не открывавшие отчёты пользователи вытесняются
+        self._history: OrderedDict[int, Counter] = OrderedDict()
+        self._tasks: dict[int, Task] = {}
+
+    def record(self, tgid: int, text_type: str, period: str) -> None:
+        self._history.setdefault(tgid, Counter())[(text_type, period)] += 1
+        self._history.move_to_end(tgid)
+        while len(self._history) > self.max_history_users:
+            self._history.popitem(last=False)
+
+    def schedule(self, tgid: int, state_data: dict) -> None:
+        # новые варианты заменяют ещё не загруженные предыдущие
+        self.cancel(tgid)
+
+        if api_circuit_breaker.is_open() or not user_tokens_db.has_tgid(str(tgid)):
+            return
+
+        candidates = self.get_candidates(tgid, state_data)
+        if not candidates:
+            return
+
+        task = create_task(self._prefetch(tgid, state_data, candidates))
+        self._tasks[tgid] = task
+
+        def forget(_: Task) -> None:
+            if self._tasks.get(tgid) is task:
+                del self._tasks[tgid]
+
+        task.add_done_callback(forget)
+
+    def cancel(self, tgid: int) -> None:
+        task = self._tasks.pop(tgid, None)
+        if task is not None:
+            task.cancel()
+
+    def get_candidates(self, tgid: int, state_data: dict) -> list[tuple[str, str, str]]:
+        # варианты (type_prefix, report:type, period), отсортированные по вероятности
+        department = state_data.get("report:department")
+        if department is None:
+            return []
+
+        # для "вся сеть (по объектам отдельно)" заранее загружаются только отчёты по всей сети, которые делятся по подразделениям
+        individually = department == ReportAllDepartmentTypes.ALL_DEPARTMENTS_INDIVIDUALLY
+        if individually and not cf.SPLIT_NETWORK_REPORTS:
+            return []
+
+        report_type = state_data.get("report:type")
+        if report_type in branch_types.get(state_data.get("report:branch"), []):
+            report_types = [report_type]
+        else:
+            report_types = branch_types.get(state_data.get("report:branch"), [])
+
+        period = state_data.get("report:period")
+        periods = [period] if period is not None else default_periods
+
+        history = self._history.get(tgid, Counter())
+        candidates = [
+            (type_prefix, _type, _period)
+            for _type in report_types
+            for _period in periods
+            for type_prefix in type_prefixes
+            if type_prefix + _type in all_report_urls
+            and (not individually or any(endpoint in department_split_endpoints for endpoint in all_report_urls[type_prefix + _type]))
+        ]
+        # сначала то, что пользователь открывал чаще, при равенстве - порядок по умолчанию
+        candidates.sort(key=lambda c: -history[(c[0] + c[1], c[2])])
+        return candidates[:self.max_reports]
+
+    async def _prefetch(self, tgid: int, state_data: dict, candidates: list[tuple[str, str, str]]) -> None:
+        for type_prefix, report_type, period in candidates:
+            candidate_state_data = state_data | {"report:type": report_type, "report:period": period}
+            try:
+                async with self._semaphore:
+                    if state_data["report:department"] == ReportAllDepartmentTypes.ALL_DEPARTMENTS_INDIVIDUALLY:
+                        # те же запросы, что и в parameters_msg
+                        token = user_tokens_db.get_token(tgid=str(tgid))
+                        departments = await get_departments(tgid)
+                        await get_split_endpoint_reports(token, type_prefix + report_type, departments, period, concurrency=1, prefetch=True)
+                    else:
+                        request_data_list = get_requests_datas_from_state_data(tgid, candidate_state_data, type_prefix)
+                        await get_reports(request_data_list, concurrency=1, prefetch=True)
+                self.prefetched += 1
+            except CancelledError:
+                raise
+            except Exception as e:
+                logger.msg("ERROR", f"Prefetch error: {tgid=}, {type_prefix=}, {report_type=}, {period=}, {e=}")
+                return
+
+    def stats(self) -> dict:
+        return {"prefetched": self.prefetched, "in_progress": len(self._tasks), "history_users": len(self._history)}
+
+
+report_prefetcher = ReportPrefetcher(
+    concurrency=cf.PREFETCH_CONCURRENCY,
+    max_reports=cf.PREFETCH_MAX_REPORTS,
+    max_history_users=cf.PREFETCH_HISTORY_MAX_USERS,
+)
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from .api import get_reports, get_token_departments_directory
+from .api_resilience import api_circuit_breaker
+from .api_util import get_requests_datas
+from .auth.tenant import tenant_registry
+from .cache.report_cache import report_cache, report_cache_key, load_persisted_report
+from .constant.urls import all_report_urls
+from .db.db import user_tokens_db
+from .handlers.types.report_all_departments_types import ReportAllDepartmentTypes
+
+from src.util.log import logger
+import config as cf
+
+
+class ReportCacheWarmer:
+    # заранее загружает в кэш отчёты за закрытые периоды ("прошлая неделя", "прошлый месяц") по всей сети,
+    # по одному пользователю от каждой организации
+    def __init__(self, periods: list[str], request_budget: int) -> None:
+        self.periods = periods
+        self.request_budget = request_budget
+        self.warmed = 0
+        self.requests = 0
+
+    def add_jobs(self, scheduler: AsyncIOScheduler) -> None:
+        warm_dt = datetime.strptime(cf.PREWARM_TIME, '%H:%M').time()
+        scheduler.add_job(self.warm, 'cron', hour=warm_dt.hour, minute=warm_dt.minute)
+
+    async def warm(self) -> None:
+        tokens = await self.get_tenant_tokens()
+        budget = self.request_budget
+        warmed = 0
+
+        for token in tokens:
+            for period in self.periods:
+                for report_type in all_report_urls:
+                    if api_circuit_breaker.is_open():
+                        logger.msg("WARNING", "Report cache warming stopped: API is unavailable")
+                        return
+
+                    request_data_list = get_requests_datas(token, report_type, ReportAllDepartmentTypes.SUM_DEPARTMENTS_TOTALLY, period)
+
+                    # считаем только запросы, которых ещё нет в кэше
+                    keys = [report_cache_key(request_data) for request_data in request_data_list]
+                    for key in keys:
+                        await load_persisted_report(key)
+                    requests_count = sum(report_cache.get(key, prefetch=True) is None for key in keys)
+                    if requests_count == 0:
+                        continue
+                    if requests_count > budget:
+                        logger.info(f"Report cache warming: request budget is over, warmed {warmed} reports")
+                        return
+
+                    budget -= requests_count
+                    self.requests += requests_count
+                    await get_reports(request_data_list, concurrency=1)
+                    warmed += 1
+                    self.warmed += 1
+
+        logger.info(f"Report cache warming: warmed {warmed} reports for {len(tokens)} tenants")
+
+    @staticmethod
+    async def get_tenant_tokens() -> list[str]:
+        # по одному токену на организацию с одинаковым набором подразделений: у таких пользователей общий кэш.
+        # список подразделений нужен, чтобы определить общий ключ кэша
+        tokens = {}
+        for tgid, token in user_tokens_db.get_all_tokens():
+            if api_circuit_breaker.is_open():
+                break
+            await get_token_departments_directory(token)
+            tokens.setdefault(tenant_registry.get_report_tenant(token), token)
+        return list(tokens.values())
+
+    def stats(self) -> dict:
+        return {"warmed": self.warmed, "requests": self.requests}
+
+
+report_cache_warmer = ReportCacheWarmer(periods=cf.PREWARM_PERIODS, request_budget=cf.PREWARM_REQUEST_BUDGET)
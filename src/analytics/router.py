@@ -3,6 +3,7 @@ from aiogram import Router
 from .auth.authorization import router as authorization_router
 from .handlers.begin import router as begin_router
 from .handlers.handlers import router as handlers_router
+from .handlers.status import router as status_router
 
 analytics_router = Router(name="analytics")
 
@@ -10,4 +11,5 @@ analytics_router.include_routers(
     authorization_router,
     begin_router,
     handlers_router,
+    status_router,
 )
\ No newline at end of file
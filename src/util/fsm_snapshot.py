@@ -0,0 +1,118 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType
+from aiogram.types import TelegramObject
+
+
+class SnapshotFSMContext(FSMContext):
+    # данные пользователя читаются из хранилища один раз за обновление,
+    # изменения ключей копятся в памяти и записываются одним разом в flush().
+    # обработка обновления может идти долго (отчёт загружается до REPORT_DEADLINE), поэтому то,
+    # что должны сразу видеть другие обновления того же пользователя, записывается сразу:
+    # состояние, замена всех данных (set_data, clear) и ключи shared_keys (их значения и читаются из хранилища)
+    def __init__(self, context: FSMContext, raw_state: str | None, shared_keys: frozenset[str] = frozenset()) -> None:
+        super().__init__(storage=context.storage, key=context.key)
+        self.shared_keys = shared_keys
+        self._state = raw_state
+        self._data: dict[str, Any] | None = None
+        # значения при чтении из хранилища: по ним flush() узнаёт ключи, изменённые другими обновлениями
+        self._loaded: dict[str, Any] = {}
+        self._changed_keys: set[str] = set()
+        self._flushed = False
+
+    async def set_state(self, state: StateType = None) -> None:
+        await super().set_state(state)
+        self._state = state.state if isinstance(state, State) else state
+
+    async def get_state(self) -> str | None:
+        if self._flushed:
+            return await super().get_state()
+        return self._state
+
+    async def set_data(self, data: dict[str, Any]) -> None:
+        await super().set_data(data)
+        if self._flushed:
+            return
+        self._data = data.copy()
+        self._loaded = data.copy()
+        self._changed_keys.clear()
+
+    async def get_data(self) -> dict[str, Any]:
+        if self._flushed:
+            return await super().get_data()
+        data = await self._load_data()
+        if self.shared_keys:
+            stored = await self.storage.get_data(key=self.key)
+            for key in self.shared_keys:
+                if key in stored:
+                    data[key] = stored[key]
+                else:
+                    data.pop(key, None)
+        return data.copy()
+
+    async def get_value(self, key: str, default: Any | None = None) -> Any | None:
+        if self._flushed or key in self.shared_keys:
+            return await super().get_value(key, default)
+        return (await self._load_data()).get(key, default)
+
+    async def update_data(self, data: dict[str, Any] | None = None, **kwargs: Any) -> dict[str, Any]:
+        if data:
+            kwargs.update(data)
+        if self._flushed:
+            return await super().update_data(kwargs)
+        shared = {key: value for key, value in kwargs.items() if key in self.shared_keys}
+        if shared:
+            await self.storage.update_data(key=self.key, data=shared)
+        (await self._load_data()).update(kwargs)
+        self._changed_keys.update(key for key in kwargs if key not in self.shared_keys)
+        return self._data.copy()
+
+    async def flush(self) -> None:
+        if self._flushed:
+            return
+        self._flushed = True
+        if not self._changed_keys:
+            return
+        # только изменённые ключи; ключ, который за время обработки изменило другое обновление
+        # (например, "назад" во время загрузки отчёта), остаётся с его значением
+        stored = await self.storage.get_data(key=self.key)
+        missing = object()
+        changes = {
+            key: self._data[key] for key in self._changed_keys
+            if stored.get(key, missing) == self._loaded.get(key, missing)
+        }
+        if changes:
+            await self.storage.update_data(key=self.key, data=changes)
+
+    async def _load_data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = await self.storage.get_data(key=self.key)
+            self._loaded = self._data.copy()
+        return self._data
+
+
+class FSMSnapshotMiddleware(BaseMiddleware):
+    # подменяет FSMContext на снимок на время обработки обновления.
+    # регистрируется после FSMContextMiddleware (dp.update.outer_middleware)
+    def __init__(self, shared_keys: set[str] | None = None) -> None:
+        self.shared_keys = frozenset(shared_keys or ())
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        context = data.get("state")
+        if context is None:
+            return await handler(event, data)
+
+        snapshot = SnapshotFSMContext(context, raw_state=data.get("raw_state"), shared_keys=self.shared_keys)
+        data["state"] = snapshot
+        try:
+            return await handler(event, data)
+        finally:
+            await snapshot.flush()
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+from asyncio import Event, Lock, Task, create_task, sleep, to_thread
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock as ThreadLock
+from time import time
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from src.util.single_flight import SingleFlight
+from src.util.log import logger
+
+
+@dataclass
+class FSMRecord:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    updated_at: float = 0
+
+
+def dump_record(record: FSMRecord) -> str:
+    # значения None сохраняются: обработчики читают некоторые ключи по индексу (state_data["report:input"])
+    return json.dumps({"s": record.state, "d": record.data}, ensure_ascii=False, separators=(',', ':'))
+
+
+def is_empty_record(record: FSMRecord) -> bool:
+    return record.state is None and not record.data
+
+
+def load_record(raw: str, updated_at: float) -> FSMRecord:
+    record = json.loads(raw)
+    return FSMRecord(state=record["s"], data=record["d"], updated_at=updated_at)
+
+
+class SQLiteStorage(BaseStorage):
+    # хранилище состояний FSM: последние max_records пользователей в памяти, все - в SQLite.
+    # изменения записываются на диск пачками в фоне; состояния, не менявшиеся ttl секунд, удаляются
+    def __init__(self, path: str, ttl: float, max_records: int, write_delay: float, key_builder: KeyBuilder | None = None) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_records = max_records
+        self.write_delay = write_delay
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._records: OrderedDict[str, FSMRecord] = OrderedDict()
+        # записи, ожидающие сохранения; пустые записи удаляются из базы
+        self._dirty: dict[str, FSMRecord] = {}
+        self._writing: dict[str, FSMRecord] = {}
+        self._loads = SingleFlight()
+        self._conn: sqlite3.Connection | None = None
+        self._conn_lock = ThreadLock()
+        self._flush_lock = Lock()
+        self._dirty_event: Event | None = None
+        self._writer: Task | None = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(key, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._get_record(key)).state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        record = await self._get_record(key)
+        record.data = data.copy()
+        self._mark_dirty(key, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._get_record(key)).data.copy()
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.cancel()
+        await self.flush()
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            self._writing, self._dirty = self._dirty, {}
+            if not self._writing:
+                return
+            # сериализуем здесь: пока идёт запись, записи могут меняться
+            rows = [(key, dump_record(record), record.updated_at) for key, record in self._writing.items() if not is_empty_record(record)]
+            empty_keys = [(key,) for key, record in self._writing.items() if is_empty_record(record)]
+            try:
+                await to_thread(self._write, rows, empty_keys)
+            except sqlite3.Error as e:
+                logger.msg("ERROR", f"Could not write FSM storage: {e=}")
+                self._dirty = self._writing | self._dirty
+            finally:
+                self._writing = {}
+
+    async def remove_idle(self) -> None:
+        # удаляет состояния пользователей, которые давно не пользовались ботом
+        min_updated_at = time() - self.ttl
+        for key in [key for key, record in self._records.items() if record.updated_at < min_updated_at and key not in self._dirty]:
+            del self._records[key]
+        removed = await to_thread(self._delete_idle, min_updated_at)
+        if removed:
+            logger.info(f"FSM storage: removed {removed} idle records")
+
+    def stats(self) -> dict:
+        return {"in_memory": len(self._records), "dirty": len(self._dirty)}
+
+    async def _get_record(self, key: StorageKey) -> FSMRecord:
+        storage_key = self.key_builder.build(key)
+        record = self._records.get(storage_key)
+        if record is None:
+            record = self._dirty.get(storage_key) or self._writing.get(storage_key)
+        if record is None:
+            record = await self._loads.do(storage_key, lambda: to_thread(self._read, storage_key))
+            # пока читали, запись могла появиться
+            record = self._records.get(storage_key) or self._dirty.get(storage_key) or record or FSMRecord(updated_at=time())
+        if record.updated_at < time() - self.ttl:
+            record = FSMRecord(updated_at=time())
+        self._records[storage_key] = record
+        self._records.move_to_end(storage_key)
+        # в памяти только недавно использованные записи; остальные уже на диске или ждут записи
+        while len(self._records) > self.max_records:
+            self._records.popitem(last=False)
+        return record
+
+    def _mark_dirty(self, key: StorageKey, record: FSMRecord) -> None:
+        record.updated_at = time()
+        self._dirty[self.key_builder.build(key)] = record
+        if self._writer is None or self._writer.done():
+            self._dirty_event = Event()
+            self._writer = create_task(self._write_dirty())
+        self._dirty_event.set()
+
+    async def _write_dirty(self) -> None:
+        while True:
+            await self._dirty_event.wait()
+            self._dirty_event.clear()
+            # собираем изменения за небольшой промежуток в одну транзакцию
+            await sleep(self.write_delay)
+            await self.flush()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS FSM (
+            key TEXT PRIMARY KEY,
+            record TEXT NOT NULL,
+            updated_at REAL NOT NULL
+            )
+            ''')
+            self._conn.execute('''
+            CREATE INDEX IF NOT EXISTS FSMUpdatedAt ON FSM (updated_at)
+            ''')
+        return self._conn
+
+    def _read(self, key: str) -> FSMRecord | None:
+        with self._conn_lock:
+            row = self._connect().execute('''
+            SELECT record, updated_at FROM FSM WHERE key == ?
+            ''', (key,)).fetchone()
+        if row is None:
+            return None
+        return load_record(*row)
+
+    def _write(self, rows: list[tuple[str, str, float]], empty_keys: list[tuple[str]]) -> None:
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany('''
+                INSERT OR REPLACE INTO FSM (key, record, updated_at) VALUES (?, ?, ?)
+                ''', rows)
+                conn.executemany('''
+                DELETE FROM FSM WHERE key == ?
+                ''', empty_keys)
+
+    def _delete_idle(self, min_updated_at: float) -> int:
+        with self._conn_lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute('''
+                DELETE FROM FSM WHERE updated_at < ?
+                ''', (min_updated_at,)).rowcount
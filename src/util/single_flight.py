@@ -0,0 +1,29 @@
+from asyncio import Future, ensure_future, shield
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    # объединяет одновременные вызовы с одинаковым ключом в один:
+    # пока вызов выполняется, остальные ждут его результат
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, Future] = {}
+        self.calls = 0         # выполнено вызовов
+        self.deduplicated = 0  # вызовов, получивших результат чужого вызова
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            future = ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.calls += 1
+        else:
+            self.deduplicated += 1
+        # shield - отмена одного из ожидающих не отменяет общий вызов
+        return await shield(future)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "deduplicated": self.deduplicated, "in_flight": self.in_flight()}
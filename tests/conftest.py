@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# config читается при импорте модулей бота, а базы создаются в resources/db текущего каталога,
+# поэтому тесты работают во временном каталоге
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+workdir = tempfile.mkdtemp(prefix="analytics-tests-")
+os.makedirs(os.path.join(workdir, "resources", "db"))
+os.chdir(workdir)
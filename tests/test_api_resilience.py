@@ -0,0 +1,90 @@
+import asyncio
+
+from aiohttp import web
+
+import config as cf
+from src.analytics import api
+from src.analytics.api_resilience import CircuitBreaker, CircuitBreakerState, api_circuit_breaker
+from src.analytics.api_session import close_session
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    # пауза уже прошла: следующий запрос будет пробным
+    breaker.state = CircuitBreakerState.OPEN
+    breaker.opened_at = 0.0
+
+
+def test_cancelled_probe_allows_next_probe():
+    breaker = CircuitBreaker(name="test", failure_threshold=1, cooldown=1)
+    open_breaker(breaker)
+
+    async def probe() -> None:
+        assert breaker.allow_request()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+
+    async def main() -> None:
+        task = asyncio.create_task(probe())
+        await asyncio.sleep(0)
+        assert not breaker.allow_request()  # пока идёт пробный запрос, остальные отклоняются
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert breaker.state == CircuitBreakerState.HALF_OPEN
+        assert breaker.allow_request()
+
+    asyncio.run(main())
+
+
+def test_release_probe_from_other_task_keeps_probe():
+    breaker = CircuitBreaker(name="test", failure_threshold=1, cooldown=1)
+    open_breaker(breaker)
+
+    async def main() -> None:
+        assert breaker.allow_request()
+
+        async def other() -> None:
+            breaker.release_probe()
+
+        await asyncio.create_task(other())
+        assert not breaker.allow_request()
+
+    asyncio.run(main())
+
+
+def test_report_request_cancelled_by_deadline_releases_probe(monkeypatch):
+    async def main() -> None:
+        stop = asyncio.Event()
+
+        async def hang(request: web.Request) -> web.Response:
+            await stop.wait()
+            return web.json_response({})
+
+        app = web.Application()
+        app.router.add_post("/api/{url}", hang)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(cf, "API_PATH", f"http://127.0.0.1:{port}")
+
+        open_breaker(api_circuit_breaker)
+        try:
+            try:
+                async with asyncio.timeout(0.2):
+                    await api.req_get_report("token", "revenue", "store", [], "2024-01-01", "2024-01-07")
+            except TimeoutError:
+                pass
+            assert api_circuit_breaker.state == CircuitBreakerState.HALF_OPEN
+            assert api_circuit_breaker.allow_request()
+        finally:
+            api_circuit_breaker.record_success()
+            stop.set()
+            await close_session()
+            await runner.cleanup()
+
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+from aiohttp import web
+
+import config as cf
+from src.analytics.api_session import close_session
+from src.analytics.auth import authorization
+from src.analytics.db.db import user_tokens_db
+
+
+class FakeMessage:
+    def __init__(self, user_id: int, text: str) -> None:
+        self.from_user = SimpleNamespace(id=user_id)
+        self.text = text
+        self.replies: list[str] = []
+
+    async def answer(self, text: str, **kwargs) -> "FakeMessage":
+        self.replies.append(text)
+        return self
+
+    async def edit_text(self, text: str, **kwargs) -> "FakeMessage":
+        self.replies.append(text)
+        return self
+
+
+class FakeState:
+    async def get_data(self) -> dict:
+        return {"server_report_login": "login"}
+
+
+def test_token_write_error_replies_and_resets_limiter(monkeypatch):
+    async def login(request: web.Request) -> web.Response:
+        return web.json_response({"token": "header.payload.signature"})
+
+    async def failing_write(tgid: str, token: str) -> None:
+        user_tokens_db.insert_user(tgid, token)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    async def main() -> None:
+        app = web.Application()
+        app.router.add_post("/api/login", login)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(cf, "API_PATH", f"http://127.0.0.1:{port}")
+        monkeypatch.setattr(user_tokens_db, "insert_user_async", failing_write)
+
+        message = FakeMessage(user_id=42, text="password")
+        try:
+            await authorization.authorize(message, FakeState())
+        finally:
+            await close_session()
+            await runner.cleanup()
+
+        assert message.replies[-1] == "Ошибка"
+        assert not user_tokens_db.has_tgid("42")
+        assert 42 not in authorization.login_limiter._attempts
+
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+import asyncio
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.util.fsm_snapshot import FSMSnapshotMiddleware
+
+
+key = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+async def add_messages_to_delete(state: FSMContext, message_ids: list[int]) -> None:
+    # как msg_util.add_messages_to_delete
+    messages_to_delete = (await state.get_data()).get("report:messages_to_delete") or []
+    await state.update_data({"report:messages_to_delete": messages_to_delete + message_ids})
+
+
+def test_overlapping_updates_share_messages_to_delete():
+    storage = MemoryStorage()
+    middleware = FSMSnapshotMiddleware(shared_keys={"report:messages_to_delete"})
+    report_sent = asyncio.Event()
+    back_done = asyncio.Event()
+    deleted: list[int] = []
+
+    async def report_handler(event, data) -> None:
+        # долгая отправка отчёта
+        state = data["state"]
+        await state.update_data({"report:step": 5})
+        await add_messages_to_delete(state, [1, 2])
+        report_sent.set()
+        await back_done.wait()
+        await add_messages_to_delete(state, [3])
+
+    async def back_handler(event, data) -> None:
+        # "назад", пока отчёт ещё отправляется
+        state = data["state"]
+        deleted.extend((await state.get_data()).get("report:messages_to_delete") or [])
+        await state.update_data({"report:messages_to_delete": [], "report:step": 2})
+        await state.set_state("AnalyticReportStates:value_input")
+        back_done.set()
+
+    def update_data() -> dict:
+        return {"state": FSMContext(storage=storage, key=key), "raw_state": None}
+
+    async def main() -> None:
+        report = asyncio.create_task(middleware(report_handler, None, update_data()))
+        await report_sent.wait()
+        await middleware(back_handler, None, update_data())
+        await report
+
+        assert deleted == [1, 2]
+        stored = await storage.get_data(key)
+        assert stored["report:messages_to_delete"] == [3]
+        # "назад" изменил шаг позже, чем его прочитала загрузка отчёта
+        assert stored["report:step"] == 2
+        assert await storage.get_state(key) == "AnalyticReportStates:value_input"
+
+    asyncio.run(main())
+
+
+def test_snapshot_writes_changed_keys_once():
+    storage = MemoryStorage()
+    middleware = FSMSnapshotMiddleware(shared_keys={"report:messages_to_delete"})
+    writes = []
+    update_data = storage.update_data
+
+    async def counting_update_data(key, data):
+        writes.append(dict(data))
+        return await update_data(key, data)
+
+    storage.update_data = counting_update_data
+
+    async def handler(event, data) -> None:
+        state = data["state"]
+        for step in range(10):
+            await state.update_data({"report:step": step})
+            assert (await state.get_data())["report:step"] == step
+
+    async def main() -> None:
+        await middleware(handler, None, {"state": FSMContext(storage=storage, key=key), "raw_state": None})
+        assert writes == [{"report:step": 9}]
+
+    asyncio.run(main())
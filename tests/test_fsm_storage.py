@@ -0,0 +1,31 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+
+from src.util.fsm_storage import SQLiteStorage
+
+
+def make_storage(path: str) -> SQLiteStorage:
+    return SQLiteStorage(path, ttl=60, max_records=10, write_delay=0)
+
+
+def test_none_values_survive_round_trip(tmp_path):
+    path = str(tmp_path / "fsm.db")
+    key = StorageKey(bot_id=1, chat_id=2, user_id=2)
+    other_key = StorageKey(bot_id=1, chat_id=3, user_id=3)
+
+    async def main() -> None:
+        storage = make_storage(path)
+        await storage.set_state(key, "AnalyticReportStates:value_input")
+        await storage.set_data(key, {"report:input": None, "report:step": 0})
+        # состояние без state, в котором есть только ключи со значением None, тоже не пустое
+        await storage.set_data(other_key, {"report:input": None})
+        await storage.close()
+
+        storage = make_storage(path)
+        assert await storage.get_state(key) == "AnalyticReportStates:value_input"
+        assert await storage.get_data(key) == {"report:input": None, "report:step": 0}
+        assert (await storage.get_data(other_key))["report:input"] is None
+        await storage.close()
+
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+import config as cf
+from src.analytics.db.kv_server import KVServer
+from src.analytics.db.kv_token_store import KVTokenStore
+
+
+class FakeStream:
+    def __init__(self) -> None:
+        self.messages: list[dict] = []
+
+    def write(self, data: bytes) -> None:
+        self.messages.append(json.loads(data))
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def remote(seq: int, tgid: str, token: str) -> dict:
+    return {"op": "batch", "origin": "other", "id": 1, "seq": seq, "set": {tgid: [token, None]}, "delete": []}
+
+
+def make_store() -> KVTokenStore:
+    store = KVTokenStore("127.0.0.1", 0)
+    store._stream = FakeStream()
+    return store
+
+
+async def send_local(store: KVTokenStore, tgid: str, token: str) -> tuple[asyncio.Task, dict]:
+    # своя пачка отправлена на сервер и ждёт подтверждения
+    store.insert_user(tgid, token)
+    store._writer.cancel()
+    task = asyncio.create_task(store.flush())
+    await asyncio.sleep(0)
+    return task, store._stream.messages[-1]
+
+
+def test_remote_write_before_local_batch_on_server():
+    async def main() -> None:
+        store = make_store()
+        task, sent = await send_local(store, "1", "local")
+
+        # на сервере чужая запись раньше своей: итог на сервере - своя
+        store._apply(remote(1, "1", "remote"))
+        assert store.get_token("1") == "local"
+        store._apply(sent | {"seq": 2})
+        await task
+        assert store.get_token("1") == "local"
+
+        # следующие чужие изменения применяются
+        store._apply(remote(3, "1", "newer"))
+        assert store.get_token("1") == "newer"
+
+    asyncio.run(main())
+
+
+def test_remote_write_after_local_batch_on_server():
+    async def main() -> None:
+        store = make_store()
+        task, sent = await send_local(store, "1", "local")
+
+        store._apply(sent | {"seq": 1})
+        await task
+        store._apply(remote(2, "1", "remote"))
+        assert store.get_token("1") == "remote"
+
+    asyncio.run(main())
+
+
+def test_stale_remote_write_is_ignored():
+    async def main() -> None:
+        store = make_store()
+        store._apply(remote(5, "1", "newer"))
+        store._apply(remote(4, "1", "older"))
+        assert store.get_token("1") == "newer"
+
+    asyncio.run(main())
+
+
+def test_clients_converge_with_server(monkeypatch):
+    monkeypatch.setattr(cf, "USER_TOKENS_DB_WRITE_DELAY", 0)
+
+    async def main() -> None:
+        kv_server = KVServer()
+        server = await kv_server.serve("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        clients = [KVTokenStore("127.0.0.1", port) for _ in range(3)]
+        for client in clients:
+            await client.start()
+        try:
+            # одновременные записи одних и тех же пользователей из разных процессов
+            for round_number in range(20):
+                for index, client in enumerate(clients):
+                    client.insert_user(str(round_number % 3), f"token-{round_number}-{index}")
+                await asyncio.gather(*(client.flush() for client in clients))
+                # изменения других клиентов приходят по своим соединениям, ждём их не дольше секунды
+                expected = {tgid: user[0] for tgid, user in kv_server.items.items()}
+                for _ in range(100):
+                    if all({tgid: client.get_token(tgid) for tgid in expected} == expected for client in clients):
+                        break
+                    await asyncio.sleep(0.01)
+                for client in clients:
+                    assert {tgid: client.get_token(tgid) for tgid in expected} == expected
+        finally:
+            for client in clients:
+                client.close()
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+from src.analytics.auth import login_limiter as login_limiter_module
+from src.analytics.auth.login_limiter import LoginAttemptsLimiter
+
+
+def test_attempts_are_limited_within_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(login_limiter_module, "monotonic", lambda: now[0])
+    limiter = LoginAttemptsLimiter(max_attempts=2, window=60)
+
+    assert limiter.try_attempt(1)
+    assert limiter.try_attempt(1)
+    assert not limiter.try_attempt(1)
+    assert limiter.retry_after(1) == 60
+
+    now[0] += 61
+    assert limiter.try_attempt(1)
+
+
+def test_expired_users_are_removed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(login_limiter_module, "monotonic", lambda: now[0])
+    limiter = LoginAttemptsLimiter(max_attempts=5, window=60)
+
+    for user_id in range(100):
+        limiter.try_attempt(user_id)
+    now[0] += 30
+    limiter.try_attempt(100)
+    assert len(limiter._attempts) == 101
+
+    # у первых 100 пользователей окно истекло
+    now[0] += 31
+    limiter.try_attempt(101)
+    assert list(limiter._attempts) == [100, 101]
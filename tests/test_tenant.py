@@ -0,0 +1,60 @@
+import asyncio
+import base64
+import json
+
+from src.analytics import api
+from src.analytics.api_util import get_request_data
+from src.analytics.auth.tenant import tenant_registry
+from src.analytics.cache.departments_cache import departments_directory
+from src.analytics.cache.persistent_cache import persistent_cache
+from src.analytics.cache.report_cache import report_cache_key
+from src.analytics.db.db import create_database
+
+
+def make_token(payload: dict) -> str:
+    def encode(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    return f"{encode({'alg': 'HS256'})}.{encode(payload)}.signature"
+
+
+def restart() -> None:
+    # состояние в памяти теряется, база токенов и кэш на диске остаются
+    tenant_registry._validated.clear()
+    tenant_registry._departments.clear()
+    departments_directory._entries.clear()
+
+
+def test_report_cache_key_survives_restart(tmp_path, monkeypatch):
+    token = make_token({"userId": "7", "slug": "ROGALIK", "exp": 4102444800})
+    path = str(tmp_path / "user_tokens.db")
+
+    async def departments_from_api(token: str) -> list[dict]:
+        tenant_registry.validate(token)
+        return [{"id": "a", "name": "1.Рогалик A"}, {"id": "b", "name": "2.Рогалик B"}]
+
+    async def api_unavailable(token: str) -> list[dict]:
+        return []
+
+    async def cache_key(db) -> tuple:
+        token = db.get_token("1")
+        await api.get_token_departments_directory(token)
+        await asyncio.gather(*persistent_cache._tasks)
+        return report_cache_key(get_request_data(token, "revenue.store", "a", "last-week"))
+
+    async def main() -> None:
+        db = create_database(path)
+        await db.insert_user_async("1", token)
+        monkeypatch.setattr(api, "req_get_departments", departments_from_api)
+        key = await cache_key(db)
+        db.close()
+
+        restart()
+        # после перезапуска список подразделений читается с диска, запросов к API нет
+        monkeypatch.setattr(api, "req_get_departments", api_unavailable)
+        db = create_database(path)
+        assert await cache_key(db) == key
+        db.close()
+
+        assert key[0].startswith("ROGALIK:")
+
+    asyncio.run(main())